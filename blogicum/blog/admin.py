@@ -10,6 +10,7 @@ class PostAdmin(admin.ModelAdmin):
         'author',
         'category',
         'is_published',
+        'comment_count',
         'created_at',
     )
     list_editable = ('is_published',)
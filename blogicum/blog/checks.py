@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# Бэкенды, данные которых видны только процессу, в котором они записаны.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """Кэш страниц и их поколений должен быть общим для всех процессов."""
+    if settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        'Кэш по умолчанию не общий для процессов веб-сервера.',
+        hint=(
+            'Сброс страниц и их ETag доходит только до процесса, в котором '
+            'изменились данные. Укажите в CACHES общий бэкенд: файловый, '
+            'Redis или Memcached.'
+        ),
+        id='blog.W001',
+    )]
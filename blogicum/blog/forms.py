@@ -1,16 +1,93 @@
 from django import forms
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.forms.models import ModelChoiceIterator
+from django.template.defaultfilters import filesizeformat
 
 from .models import Comment, Post
+from .registry import REGISTRIES
 
 
 User = get_user_model()
 
 
+class RegistryChoiceIterator(ModelChoiceIterator):
+    """Варианты выбора из реестра вместо запроса к базе."""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for obj in self.field.registry.all():
+            yield self.choice(obj)
+
+    def __len__(self):
+        return len(self.field.registry.all()) + (
+            self.field.empty_label is not None
+        )
+
+
+class RegistryChoiceField(forms.ModelChoiceField):
+    """Поле выбора категории или места, читающее записи из реестра."""
+
+    iterator = RegistryChoiceIterator
+
+    @property
+    def registry(self):
+        return REGISTRIES[self.queryset.model]
+
+    def to_python(self, value):
+        """Находит выбранную запись в реестре, сверив его с базой."""
+        if value in self.empty_values:
+            return None
+        if isinstance(value, self.queryset.model):
+            value = value.pk
+        try:
+            pk = self.queryset.model._meta.pk.to_python(value)
+        except ValidationError:
+            pk = None
+        obj = self.registry.get(pk, fresh=True)
+        if obj is None:
+            raise ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': value},
+            )
+        return obj
+
+
+class ImageUploadField(forms.ImageField):
+    """Поле изображения, сообщающее об отказе обработчика загрузки."""
+
+    default_error_messages = {
+        'too_large': 'Размер файла не должен превышать %(limit)s.',
+        'not_image': (
+            'Загрузите изображение в формате JPEG, PNG, GIF или WebP.'
+        ),
+    }
+
+    def to_python(self, data):
+        error = getattr(data, 'upload_error', None)
+        if error:
+            raise ValidationError(
+                self.error_messages[error],
+                code=error,
+                params={'limit': filesizeformat(
+                    settings.POST_IMAGE_MAX_UPLOAD_SIZE
+                )},
+            )
+        return super().to_python(data)
+
+
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         exclude = ('author',)
+        field_classes = {
+            'category': RegistryChoiceField,
+            'location': RegistryChoiceField,
+            'image': ImageUploadField,
+        }
         widgets = {
             'text': forms.Textarea(attrs={'rows': 3}),
             'pub_date': forms.DateTimeInput(
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .registry import attach_categories_and_locations
+
+
+def fragment_key(name, obj, *parts):
+    """Ключ фрагмента: id объекта, его версия и прочие отметки данных."""
+    return ':'.join(
+        str(part)
+        for part in ('blog:fragment', name, obj.pk, obj.version, *parts)
+    )
+
+
+def post_card_stamps(post):
+    """Отметки изменения категории и места, подставленных из реестров.
+
+    Другой процесс меняет версию поста в базе сразу, а реестр этого
+    процесса может ещё хранить прежнюю категорию. С отметками в ключе
+    карточка, отрисованная по устаревшему реестру, не совпадёт с ключом
+    после его обновления.
+    """
+    return tuple(
+        obj.updated_at.timestamp() if obj is not None else ''
+        for obj in (post.category, post.location)
+    )
+
+
+def attach_fragments(objects, name, template_name, context_name, attr,
+                     stamps=None):
+    """Кладёт в атрибут объектов готовый HTML их фрагментов.
+
+    Все фрагменты страницы запрашиваются из кэша одним get_many,
+    недостающие рендерятся и сохраняются одним set_many. Функция stamps
+    добавляет в ключ фрагмента отметки данных, не входящих в версию.
+    """
+    objects = list(objects)
+    keys = {
+        fragment_key(name, obj, *(stamps(obj) if stamps else ())): obj
+        for obj in objects
+    }
+    cached = cache.get_many(keys)
+    rendered = {}
+    for key, obj in keys.items():
+        html = cached.get(key)
+        if html is None:
+            html = rendered[key] = render_to_string(
+                template_name, {context_name: obj}
+            )
+        setattr(obj, attr, mark_safe(html))
+    if rendered:
+        cache.set_many(rendered, settings.FRAGMENT_CACHE_TIMEOUT)
+    return objects
+
+
+def render_post_cards(posts):
+    """Карточки постов для лент с категориями и местами из реестров."""
+    posts = attach_categories_and_locations(list(posts))
+    return attach_fragments(
+        posts, 'post_card', 'includes/post_card.html', 'post', 'card_html',
+        post_card_stamps
+    )
+
+
+def render_comment_bodies(comments):
+    """Тела комментариев без зависящих от пользователя кнопок."""
+    return attach_fragments(
+        comments, 'comment', 'includes/comment_body.html', 'comment',
+        'body_html'
+    )
@@ -0,0 +1,15 @@
+from django.shortcuts import get_object_or_404
+
+
+def get_object_once(request, queryset, **lookup):
+    """Объект по условию, загружаемый из БД не больше раза за запрос.
+
+    Найденные объекты хранятся в самом запросе, поэтому миксины
+    и методы view, которым нужен один и тот же объект, получают
+    один экземпляр без повторного SELECT.
+    """
+    identity_map = request.__dict__.setdefault('_identity_map', {})
+    key = (queryset.model._meta.label, tuple(sorted(lookup.items())))
+    if key not in identity_map:
+        identity_map[key] = get_object_or_404(queryset, **lookup)
+    return identity_map[key]
@@ -0,0 +1,173 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+
+from core.models import new_version
+from .images import build_image_meta, delete_variants, save_file
+from .models import Post
+from .og import og_directory, og_image_name, render_og_image
+from .page_cache import invalidate_post_pages
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_og_pending = set()
+_og_lock = threading.Lock()
+
+
+def get_executor():
+    """Пул потоков обработки изображений, общий для процесса."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS,
+                thread_name_prefix='post-images'
+            )
+    return _executor
+
+
+def save_image_meta(post_id, source, meta):
+    """Сохраняет описание вариантов, если у поста всё ещё тот же файл."""
+    updated = Post.objects.filter(pk=post_id, image=source).update(
+        image_meta=meta, version=new_version()
+    )
+    if updated:
+        invalidate_post_pages([post_id])
+    return bool(updated)
+
+
+def process_post_image(post_id):
+    """Создаёт варианты изображения поста и сохраняет их описание.
+
+    Если тот же файл уже обработан для другого поста, его описание
+    переиспользуется без повторного кодирования.
+    """
+    try:
+        source = Post.objects.filter(pk=post_id).values_list(
+            'image', flat=True
+        ).first()
+        if source:
+            meta = Post.objects.filter(
+                image=source, image_meta__source=source
+            ).values_list('image_meta', flat=True).first()
+            save_image_meta(post_id, source, meta or build_image_meta(source))
+    except Exception:
+        logger.exception('Не удалось обработать изображение поста %s', post_id)
+    finally:
+        if settings.IMAGE_WORKERS:
+            connections.close_all()
+
+
+def schedule_post_image(post_id):
+    """Ставит обработку изображения в очередь после фиксации транзакции.
+
+    При IMAGE_WORKERS = 0 изображение обрабатывается сразу, в том же
+    потоке: так удобнее в тестах и при отладке.
+    """
+    def submit():
+        if settings.IMAGE_WORKERS:
+            get_executor().submit(process_post_image, post_id)
+        else:
+            process_post_image(post_id)
+
+    transaction.on_commit(submit)
+
+
+def release_post_image(name):
+    """Удаляет файл изображения и его варианты, если он больше не нужен.
+
+    Файл остаётся, пока на него ссылается хотя бы один пост, и ещё
+    POST_IMAGE_RELEASE_GRACE секунд после последней загрузки того же
+    содержимого: пост с этой загрузкой мог ещё не попасть в базу.
+    """
+    if Post.objects.filter(image=name).exists():
+        return False
+    storage = Post._meta.get_field('image').storage
+    try:
+        modified = storage.get_modified_time(name)
+    except FileNotFoundError:
+        return False
+    grace = timedelta(seconds=settings.POST_IMAGE_RELEASE_GRACE)
+    if timezone.now() - modified < grace:
+        return False
+    storage.delete(name)
+    delete_variants(name)
+    return True
+
+
+def schedule_image_release(name):
+    """Освобождает файл изображения после фиксации транзакции."""
+    def release():
+        try:
+            release_post_image(name)
+        except Exception:
+            logger.exception('Не удалось освободить изображение %s', name)
+
+    transaction.on_commit(release)
+
+
+def delete_og_images(post_id, keep=None):
+    """Удаляет превью поста, кроме файла keep."""
+    directory = og_directory(post_id)
+    try:
+        _, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for file in files:
+        name = f'{directory}/{file}'
+        if name != keep:
+            default_storage.delete(name)
+
+
+def build_og_image(post_id):
+    """Рисует превью поста для соцсетей, если его ещё нет для текущих полей.
+
+    Прежние превью поста удаляются, а страница поста сбрасывается из кэша,
+    чтобы в ней появились метатеги нового превью.
+    """
+    try:
+        post = Post.objects.select_related('author', 'category').filter(
+            pk=post_id
+        ).first()
+        if post is None:
+            return
+        name = og_image_name(post)
+        if not default_storage.exists(name):
+            save_file(default_storage, name, render_og_image(post))
+            delete_og_images(post_id, keep=name)
+            invalidate_post_pages([post_id])
+    except Exception:
+        logger.exception('Не удалось создать превью поста %s', post_id)
+    finally:
+        with _og_lock:
+            _og_pending.discard(post_id)
+        if settings.IMAGE_WORKERS:
+            connections.close_all()
+
+
+def schedule_og_image(post_id):
+    """Ставит создание превью в очередь, не дублируя уже стоящее.
+
+    Всплеск запросов страницы, у которой ещё нет превью, ставит в очередь
+    одну задачу, а не рисует превью в каждом запросе.
+    """
+    def submit():
+        with _og_lock:
+            if post_id in _og_pending:
+                return
+            _og_pending.add(post_id)
+        if settings.IMAGE_WORKERS:
+            get_executor().submit(build_og_image, post_id)
+        else:
+            build_og_image(post_id)
+
+    transaction.on_commit(submit)
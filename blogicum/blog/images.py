@@ -0,0 +1,304 @@
+import base64
+import posixpath
+from collections import namedtuple
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import ExifTags, Image, ImageOps
+
+
+VARIANTS_ROOT = 'variants'
+
+# Ориентации EXIF, при которых ширина и высота меняются местами.
+ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+# Форматы загрузок, которые пересохраняются без метаданных.
+NORMALIZED_FORMATS = {'JPEG', 'PNG', 'WEBP'}
+
+ImageFormat = namedtuple(
+    'ImageFormat', ('extension', 'mime_type', 'pillow_format', 'options')
+)
+
+FORMATS = {
+    'avif': ImageFormat('avif', 'image/avif', 'AVIF', {'speed': 8}),
+    'webp': ImageFormat('webp', 'image/webp', 'WEBP', {'method': 4}),
+    'jpeg': ImageFormat(
+        'jpg', 'image/jpeg', 'JPEG', {'optimize': True, 'progressive': True}
+    ),
+}
+
+
+def variant_name(source, variant, extension):
+    """Имя файла варианта: каталог с именем оригинала и имя варианта."""
+    return posixpath.join(VARIANTS_ROOT, source, f'{variant}.{extension}')
+
+
+def flatten(image):
+    """Переводит изображение в RGB, подкладывая белый фон под прозрачность."""
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def oriented_size(image):
+    """Размеры изображения с учётом поворота из EXIF, без декодирования."""
+    width, height = image.size
+    orientation = image.getexif().get(ExifTags.Base.Orientation)
+    if orientation in ROTATED_ORIENTATIONS:
+        return height, width
+    return width, height
+
+
+def normalize_image(file):
+    """Изображение, повёрнутое по EXIF и пересохранённое без метаданных.
+
+    Возвращает новое содержимое (None, если формат не пересохраняется:
+    анимации и редкие форматы остаются как есть) и размеры изображения.
+    """
+    file.seek(0)
+    with Image.open(file) as image:
+        size = oriented_size(image)
+        if (
+            image.format not in NORMALIZED_FORMATS
+            or getattr(image, 'n_frames', 1) > 1
+        ):
+            file.seek(0)
+            return None, size
+        options = {'icc_profile': image.info.get('icc_profile')}
+        if image.getexif().get(ExifTags.Base.Orientation, 1) != 1:
+            normalized = ImageOps.exif_transpose(image)
+            options['quality'] = 95
+        else:
+            normalized = image
+            options['quality'] = 'keep' if image.format == 'JPEG' else 90
+        buffer = BytesIO()
+        normalized.save(buffer, image.format, **options)
+    return buffer.getvalue(), size
+
+
+def normalize_upload(field_file):
+    """Нормализует загрузку до сохранения в хранилище.
+
+    Содержимое файла поля заменяется, возвращается начальное описание
+    изображения с его размерами.
+    """
+    data, (width, height) = normalize_image(field_file.file)
+    if data is not None:
+        field_file.file = ContentFile(data, name=field_file.file.name)
+    return {'width': width, 'height': height}
+
+
+def image_formats():
+    """Форматы вариантов из настроек, которые умеет кодировать Pillow.
+
+    JPEG нужен как запасной вариант для всех браузеров и есть всегда.
+    """
+    Image.init()
+    formats = [
+        name for name in settings.POST_IMAGE_FORMATS
+        if FORMATS[name].pillow_format in Image.SAVE
+    ]
+    if 'jpeg' not in formats:
+        formats.append('jpeg')
+    return formats
+
+
+def encode(image, fmt='jpeg'):
+    """Кодирует изображение в формат с качеством из настроек."""
+    image_format = FORMATS[fmt]
+    buffer = BytesIO()
+    image.save(
+        buffer, image_format.pillow_format,
+        quality=settings.POST_IMAGE_QUALITY[fmt], **image_format.options
+    )
+    return buffer.getvalue()
+
+
+def parse_accept(accept):
+    """Вес q каждого диапазона MIME-типов из заголовка Accept."""
+    ranges = {}
+    for item in accept.split(','):
+        media_range, *params = (part.strip() for part in item.split(';'))
+        if not media_range:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        ranges[media_range.lower()] = quality
+    return ranges
+
+
+def negotiate_format(accept):
+    """Лучший доступный формат с учётом весов q в заголовке Accept.
+
+    AVIF и WebP выбираются, только если браузер назвал их явно: по image/*
+    их поддержку не определить. JPEG подходит и под image/* или */*, а
+    если браузер отказался от всех форматов, отдаётся всё равно он.
+    """
+    ranges = parse_accept(accept)
+
+    def quality(fmt):
+        mime_type = FORMATS[fmt].mime_type
+        if mime_type in ranges:
+            return ranges[mime_type]
+        if fmt == 'jpeg':
+            return ranges.get('image/*', ranges.get('*/*', 0.0))
+        return 0.0
+
+    best, best_quality = 'jpeg', 0.0
+    for fmt in image_formats():
+        if quality(fmt) > best_quality:
+            best, best_quality = fmt, quality(fmt)
+    return best
+
+
+def make_placeholder(image):
+    """Крошечная копия изображения в виде data: URI для заглушки."""
+    thumbnail = image.copy()
+    size = settings.POST_IMAGE_PLACEHOLDER_SIZE
+    thumbnail.thumbnail((size, size), Image.Resampling.BOX)
+    buffer = BytesIO()
+    thumbnail.save(buffer, 'JPEG', quality=40, optimize=True)
+    data = base64.b64encode(buffer.getvalue()).decode('ascii')
+    return f'data:image/jpeg;base64,{data}'
+
+
+def save_file(storage, name, data):
+    """Сохраняет файл под точным именем, заменяя прежнюю версию."""
+    if storage.exists(name):
+        storage.delete(name)
+    return storage.save(name, ContentFile(data))
+
+
+def delete_variants(source, storage=default_storage):
+    """Удаляет все варианты изображения."""
+    directory = posixpath.join(VARIANTS_ROOT, source)
+    try:
+        _, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for file in files:
+        storage.delete(posixpath.join(directory, file))
+
+
+def build_image_meta(source, storage=default_storage):
+    """Создаёт варианты изображения поста и возвращает их описание.
+
+    Варианты уменьшаются последовательно от большего к меньшему,
+    а изображения уже меньше нужной ширины не увеличиваются.
+    """
+    widths = settings.POST_IMAGE_VARIANTS
+    formats = image_formats()
+    with storage.open(source) as file:
+        image = Image.open(file)
+        width, height = oriented_size(image)
+        image.draft('RGB', (max(widths.values()),) * 2)
+        image = flatten(ImageOps.exif_transpose(image))
+    meta = {
+        'source': source,
+        'width': width,
+        'height': height,
+        'placeholder': make_placeholder(image),
+        'variants': {},
+    }
+    for variant, width in sorted(
+        widths.items(), key=lambda item: item[1], reverse=True
+    ):
+        if image.width > width:
+            image = image.resize(
+                (width, round(image.height * width / image.width)),
+                Image.Resampling.LANCZOS
+            )
+        meta['variants'][variant] = {
+            'width': image.width,
+            'height': image.height,
+            'files': {
+                fmt: save_file(
+                    storage,
+                    variant_name(source, variant, FORMATS[fmt].extension),
+                    encode(image, fmt)
+                )
+                for fmt in formats
+            },
+        }
+    return meta
+
+
+class ImageVariant:
+    """Один размер изображения для шаблона."""
+
+    def __init__(self, url, width=None, height=None, urls=None):
+        self.url = url
+        self.width = width
+        self.height = height
+        self.urls = urls or {}
+
+
+class ImageSet:
+    """Готовые варианты изображения поста для шаблонов.
+
+    Пока варианты не созданы (или описание относится к прежнему файлу),
+    все размеры ссылаются на оригинал. Размеры оригинала записываются
+    в описание при загрузке, поэтому для разметки файл не открывается.
+    """
+
+    def __init__(self, field_file, meta, storage=default_storage):
+        self.original_url = field_file.url
+        self.width = meta.get('width') if meta else None
+        self.height = meta.get('height') if meta else None
+        self.placeholder = None
+        self.variants = {}
+        if meta and meta.get('source') == field_file.name:
+            self.placeholder = meta.get('placeholder')
+            self.variants = {
+                name: ImageVariant(
+                    storage.url(variant['files']['jpeg']),
+                    variant['width'],
+                    variant['height'],
+                    {
+                        fmt: storage.url(file)
+                        for fmt, file in variant['files'].items()
+                    }
+                )
+                for name, variant in meta['variants'].items()
+            }
+
+    def __getattr__(self, name):
+        if name in settings.POST_IMAGE_VARIANTS:
+            return self.variants.get(name) or ImageVariant(
+                self.original_url, self.width, self.height
+            )
+        raise AttributeError(name)
+
+    def get_srcset(self, fmt='jpeg'):
+        """Значение srcset формата из всех вариантов без повторов ширины."""
+        widths = {}
+        for variant in self.variants.values():
+            if fmt in variant.urls:
+                widths.setdefault(variant.width, variant.urls[fmt])
+        return ', '.join(
+            f'{url} {width}w' for width, url in sorted(widths.items())
+        )
+
+    @property
+    def srcset(self):
+        return self.get_srcset()
+
+    @property
+    def sources(self):
+        """Источники <picture> в современных форматах, лучший первым."""
+        return [
+            {'type': FORMATS[fmt].mime_type, 'srcset': srcset}
+            for fmt in FORMATS
+            if fmt != 'jpeg' and (srcset := self.get_srcset(fmt))
+        ]
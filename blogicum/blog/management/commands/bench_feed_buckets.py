@@ -0,0 +1,142 @@
+import random
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from blog.models import Category, Location, Post
+from blog.scheduler import bucketed_now, publish_due_posts
+from core.sqlite import database_copy
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Моделирует ленту с отложенными постами и несколькими процессами '
+        'веб-сервера и сравнивает долю попаданий в кэш страниц при точном '
+        'и округлённом до интервала «сейчас». Данные пишутся во временную '
+        'копию базы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bucket', type=int, default=30)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--duration', type=int, default=600)
+        parser.add_argument('--rps', type=int, default=5)
+        parser.add_argument('--scheduled', type=int, default=60)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Замер рассчитан на базу SQLite.')
+        random.seed(options['seed'])
+        # Процессы веб-сервера делят один кэш (CACHES), поэтому сброс,
+        # сделанный планировщиком любого из них, виден всем. Замер идёт
+        # на временных копиях того же кэша и базы: рабочие данные не
+        # меняются, а запись в базу не блокируется на время замера.
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            CACHES={
+                'default': {
+                    **settings.CACHES['default'],
+                    'LOCATION': f'{directory}/cache',
+                }
+            }
+        ), database_copy(directory):
+            self.populate(options)
+            for mode in ('exact', 'bucketed'):
+                self.report(mode, self.simulate(mode, options))
+
+    def populate(self, options):
+        """Создаёт опубликованные и отложенные посты одной категории."""
+        self.start = timezone.now()
+        author = User.objects.create(username='bench_feed_author')
+        category = Category.objects.create(
+            title='Категория', description='', slug='bench-feed-category'
+        )
+        location = Location.objects.create(name='Место')
+        posts = [
+            Post(
+                title=f'Пост {i}',
+                text='Текст публикации.',
+                pub_date=self.start + timedelta(
+                    seconds=random.uniform(-86400, 0)
+                    if i < 30 else random.uniform(0, options['duration'])
+                ),
+                author=author,
+                category=category,
+                location=location,
+            )
+            for i in range(30 + options['scheduled'])
+        ]
+        Post.objects.bulk_create(posts)
+        self.scheduled = Post.objects.filter(pub_date__gt=self.start)
+
+    def ticks(self, mode, options):
+        """Моменты срабатывания планировщиков всех процессов."""
+        bucket = options['bucket']
+        if mode == 'bucketed':
+            return set(range(0, options['duration'], bucket))
+        return {
+            (worker * bucket // options['workers']) + step
+            for worker in range(options['workers'])
+            for step in range(0, options['duration'], bucket)
+        }
+
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def simulate(self, mode, options):
+        Post.objects.filter(pk__in=self.scheduled).update(is_visible=False)
+        cache.clear()
+        client = Client()
+        ticks = self.ticks(mode, options)
+        stats = {'requests': 0, 'hits': 0, 'invalidations': 0, 'delays': []}
+        for second in range(options['duration']):
+            now = self.start + timedelta(seconds=second)
+            if second in ticks:
+                self.tick(mode, now, options, stats)
+            for _ in range(options['rps']):
+                with CaptureQueriesContext(connection) as captured:
+                    client.get('/')
+                stats['requests'] += 1
+                stats['hits'] += not captured.captured_queries
+        return stats
+
+    def tick(self, mode, now, options, stats):
+        """Один проход планировщика с замером задержки открытия постов."""
+        if mode == 'bucketed':
+            now = bucketed_now(now, options['bucket'])
+        pending = dict(
+            self.scheduled.filter(is_visible=False)
+            .values_list('pk', 'pub_date')
+        )
+        if not publish_due_posts(now=now):
+            return
+        stats['invalidations'] += 1
+        opened = self.scheduled.filter(pk__in=pending, is_visible=True)
+        stats['delays'].extend(
+            (now - pending[pk]).total_seconds()
+            for pk in opened.values_list('pk', flat=True)
+        )
+
+    def report(self, mode, stats):
+        delays = stats['delays'] or [0]
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\n{mode}:'))
+        self.stdout.write(
+            f'  запросов: {stats["requests"]}, '
+            f'попаданий в кэш: {stats["hits"]} '
+            f'({stats["hits"] / stats["requests"]:.1%})'
+        )
+        self.stdout.write(f'  сбросов ленты: {stats["invalidations"]}')
+        self.stdout.write(
+            f'  задержка открытия поста: средняя '
+            f'{sum(delays) / len(delays):.1f} с, '
+            f'максимальная {max(delays):.1f} с'
+        )
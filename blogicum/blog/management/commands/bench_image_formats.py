@@ -0,0 +1,108 @@
+import random
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageDraw, ImageFilter, ImageOps
+
+from blog.images import encode, flatten, image_formats
+from blog.models import Post
+
+
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp'}
+
+
+class Command(BaseCommand):
+    help = (
+        'Кодирует варианты изображений выборки во все доступные форматы '
+        'и сравнивает их размер и время кодирования с JPEG.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corpus',
+            help=(
+                'Каталог с изображениями. По умолчанию берутся изображения '
+                'постов, а если их нет, генерируются синтетические.'
+            )
+        )
+        parser.add_argument('--limit', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        formats = image_formats()
+        totals = {fmt: {'bytes': 0, 'seconds': 0.0} for fmt in formats}
+        count = 0
+        for image in self.corpus(options):
+            count += 1
+            for width in sorted(
+                set(settings.POST_IMAGE_VARIANTS.values()), reverse=True
+            ):
+                if image.width > width:
+                    image = image.resize(
+                        (width, round(image.height * width / image.width)),
+                        Image.Resampling.LANCZOS
+                    )
+                for fmt in formats:
+                    started = time.perf_counter()
+                    data = encode(image, fmt)
+                    totals[fmt]['seconds'] += time.perf_counter() - started
+                    totals[fmt]['bytes'] += len(data)
+        if not count:
+            self.stderr.write('В выборке нет изображений.')
+            return
+        self.report(count, totals)
+
+    def corpus(self, options):
+        """Изображения выборки в RGB, уже повёрнутые по EXIF."""
+        limit = options['limit']
+        if options['corpus']:
+            paths = sorted(
+                path for path in Path(options['corpus']).rglob('*')
+                if path.suffix.lower() in IMAGE_SUFFIXES
+            )[:limit]
+            for path in paths:
+                with Image.open(path) as image:
+                    yield flatten(ImageOps.exif_transpose(image))
+            return
+        sources = list(
+            Post.objects.exclude(image='').order_by('-pk')
+            .values_list('image', flat=True).distinct()[:limit]
+        )
+        if not sources:
+            yield from self.synthetic(options)
+            return
+        for source in sources:
+            with default_storage.open(source) as file:
+                with Image.open(file) as image:
+                    yield flatten(ImageOps.exif_transpose(image))
+
+    def synthetic(self, options):
+        """Размытые фигуры на градиенте, похожие на фотографии."""
+        rng = random.Random(options['seed'])
+        for _ in range(min(options['limit'], 10)):
+            image = Image.linear_gradient('L').resize((2400, 1600)).convert(
+                'RGB'
+            )
+            draw = ImageDraw.Draw(image)
+            for _ in range(40):
+                x, y = rng.randrange(2400), rng.randrange(1600)
+                radius = rng.randrange(40, 400)
+                draw.ellipse(
+                    (x - radius, y - radius, x + radius, y + radius),
+                    fill=tuple(rng.randrange(256) for _ in range(3))
+                )
+            yield image.filter(ImageFilter.GaussianBlur(3))
+
+    def report(self, count, totals):
+        baseline = totals['jpeg']['bytes']
+        self.stdout.write(f'Изображений: {count}')
+        for fmt, total in totals.items():
+            saved = 1 - total['bytes'] / baseline
+            self.stdout.write(
+                f'  {fmt:5} {total["bytes"] / 1024:10.1f} КиБ '
+                f'(экономия к JPEG {saved:.1%}), '
+                f'кодирование {total["seconds"]:.2f} с'
+            )
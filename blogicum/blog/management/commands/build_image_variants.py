@@ -0,0 +1,92 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from blog.image_tasks import save_image_meta
+from blog.images import build_image_meta
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт варианты изображений постов, у которых их ещё нет, '
+        'параллельно на всех ядрах процессора.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересоздать варианты всех изображений.'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Количество процессов обработки.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Количество постов, выбираемых из базы за раз.'
+        )
+
+    def handle(self, *args, **options):
+        pending = self.pending(options['all'], options['batch_size'])
+        processed = failed = 0
+        # Соединения с базой не должны наследоваться дочерними процессами.
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=options['workers'], initializer=django.setup
+        ) as executor:
+            for batch in pending:
+                futures = {
+                    executor.submit(build_image_meta, source): source
+                    for source in batch
+                }
+                for future in as_completed(futures):
+                    source = futures[future]
+                    try:
+                        meta = future.result()
+                    except Exception as error:
+                        failed += 1
+                        self.stderr.write(f'{source}: {error}')
+                        continue
+                    for post_id in batch[source]:
+                        save_image_meta(post_id, source, meta)
+                    processed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {processed}, с ошибками: {failed}'
+        ))
+
+    def pending(self, reprocess, batch_size):
+        """Пачки «имя файла → id постов» для изображений без вариантов.
+
+        Изображения, обработанные до появления заглушек, тоже попадают
+        в пачки, чтобы получить заглушку.
+        """
+        queryset = (
+            Post.objects.exclude(image='').exclude(image__isnull=True)
+            .order_by('pk')
+            .values_list(
+                'pk', 'image', 'image_meta__source',
+                'image_meta__placeholder'
+            )
+        )
+        last_pk = 0
+        while rows := list(queryset.filter(pk__gt=last_pk)[:batch_size]):
+            last_pk = rows[-1][0]
+            batch = defaultdict(list)
+            for pk, source, processed_source, placeholder in rows:
+                if (
+                    reprocess or processed_source != source
+                    or placeholder is None
+                ):
+                    batch[source].append(pk)
+            if batch:
+                yield batch
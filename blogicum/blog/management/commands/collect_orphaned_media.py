@@ -0,0 +1,183 @@
+import os
+import posixpath
+import time
+from itertools import groupby
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import CharField, Value
+from django.db.models.functions import Concat
+from django.template.defaultfilters import filesizeformat
+
+from blog.images import VARIANTS_ROOT
+from blog.models import Post
+
+
+def walk_sorted(root, prefix=''):
+    """Файлы каталога в порядке сравнения их путей как строк.
+
+    Выдаёт (путь относительно root, размер, время изменения). Каталоги
+    сортируются вместе с файлами по имени с «/» на конце: так порядок
+    совпадает с ORDER BY по столбцу путей, а в памяти держится только
+    содержимое текущих каталогов.
+    """
+    try:
+        with os.scandir(os.path.join(root, prefix)) as entries:
+            names = sorted(
+                entry.name + '/' if entry.is_dir(follow_symlinks=False)
+                else entry.name
+                for entry in entries
+            )
+    except FileNotFoundError:
+        return
+    for name in names:
+        path = prefix + name
+        if name.endswith('/'):
+            yield from walk_sorted(root, path)
+        else:
+            stat = os.stat(os.path.join(root, path))
+            yield path, stat.st_size, stat.st_mtime
+
+
+def prune_empty(directory, stop):
+    """Удаляет пустые каталоги от directory вверх, не доходя до stop."""
+    while directory != stop and directory.startswith(stop):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return
+        directory = os.path.dirname(directory)
+
+
+def unreferenced(candidates, referenced):
+    """Кандидаты, ключей которых нет в отсортированном потоке ссылок.
+
+    Оба потока отсортированы по ключу и сливаются за один проход.
+    Порядок строк в Python совпадает с двоичным сравнением строк SQLite.
+    """
+    reference = next(referenced, None)
+    for candidate in candidates:
+        key = candidate[0]
+        while reference is not None and reference < key:
+            reference = next(referenced, None)
+        if reference != key:
+            yield candidate
+
+
+class Command(BaseCommand):
+    help = (
+        'Находит и удаляет файлы изображений постов и их вариантов, на '
+        'которые не ссылается ни один пост.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, сколько места можно освободить.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Количество изображений, удаляемых за раз.'
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.5,
+            help='Пауза между пачками удалений в секундах.'
+        )
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        try:
+            images_root = storage.path('')
+            variants_root = default_storage.path(VARIANTS_ROOT)
+        except NotImplementedError:
+            raise CommandError('Сборка мусора возможна только на диске.')
+        self.options = options
+        self.cutoff = time.time() - settings.POST_IMAGE_RELEASE_GRACE
+        self.totals = {'files': 0, 'bytes': 0}
+        images = Post.objects.exclude(image='').exclude(image__isnull=True)
+        self.collect(
+            images_root,
+            self.originals(images_root),
+            images.order_by('image').values_list('image', flat=True)
+            .distinct().iterator(chunk_size=2000)
+        )
+        self.collect(
+            variants_root,
+            self.variants(variants_root),
+            images.annotate(directory=Concat(
+                'image', Value('/'), output_field=CharField()
+            ))
+            .order_by('directory').values_list('directory', flat=True)
+            .distinct().iterator(chunk_size=2000)
+        )
+        action = 'Можно освободить' if options['dry_run'] else 'Освобождено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action}: {filesizeformat(self.totals["bytes"])}, '
+            f'файлов: {self.totals["files"]}'
+        ))
+
+    def originals(self, root):
+        """Оригиналы: (имя в столбце image, файлы, размер, mtime)."""
+        upload_dir = settings.POST_IMAGE_UPLOAD_DIR
+        for path, size, mtime in walk_sorted(root, upload_dir):
+            yield path, [os.path.join(root, path)], size, mtime
+
+    def variants(self, root):
+        """Каталоги вариантов: (имя оригинала с «/», файлы, размер, mtime)."""
+        files = walk_sorted(root)
+        for directory, group in groupby(
+            files, key=lambda file: posixpath.dirname(file[0]) + '/'
+        ):
+            group = list(group)
+            yield (
+                directory,
+                [os.path.join(root, path) for path, _, _ in group],
+                sum(size for _, size, _ in group),
+                max(mtime for _, _, mtime in group)
+            )
+
+    def collect(self, root, candidates, referenced):
+        """Удаляет неиспользуемые файлы пачками с паузами между ними.
+
+        Файлы моложе POST_IMAGE_RELEASE_GRACE не трогаются: пост с такой
+        загрузкой мог ещё не попасть в базу.
+        """
+        batch = []
+        for candidate in unreferenced(candidates, referenced):
+            if candidate[3] > self.cutoff:
+                continue
+            batch.append(candidate)
+            if len(batch) >= self.options['batch_size']:
+                self.delete(root, batch)
+                batch = []
+        if batch:
+            self.delete(root, batch)
+
+    def delete(self, root, batch):
+        """Перепроверяет пачку точечным запросом и удаляет файлы."""
+        names = [name.removesuffix('/') for name, *_ in batch]
+        referenced = set(
+            Post.objects.filter(image__in=names)
+            .values_list('image', flat=True)
+        )
+        for name, paths, size, _ in batch:
+            if name.removesuffix('/') in referenced:
+                continue
+            self.totals['files'] += len(paths)
+            self.totals['bytes'] += size
+            if self.options['dry_run']:
+                continue
+            for path in paths:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            prune_empty(os.path.dirname(paths[0]), root)
+        if not self.options['dry_run']:
+            time.sleep(self.options['pause'])
@@ -0,0 +1,157 @@
+import random
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from blog.models import Category, Comment, Location, Post
+from core.sqlite import database_copy
+
+
+User = get_user_model()
+
+PLAN_WARNINGS = ('USE TEMP B-TREE', 'SCAN blog_post', 'SCAN blog_comment')
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими данными, выполняет запросы страниц '
+        'блога и печатает для них EXPLAIN QUERY PLAN. Всё пишется во '
+        'временную копию базы, кэша и медиафайлов: рабочие данные и '
+        'блокировки не затрагиваются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=50000)
+        parser.add_argument('--comments', type=int, default=200000)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Планы запросов разбираются только в SQLite.')
+        random.seed(options['seed'])
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            CACHES={
+                'default': {
+                    **settings.CACHES['default'],
+                    'LOCATION': f'{directory}/cache',
+                }
+            },
+            MEDIA_ROOT=f'{directory}/media',
+            # Задачи изображений выполняются сразу: фоновый поток мог бы
+            # закончить их уже после удаления временного каталога.
+            IMAGE_WORKERS=0,
+        ), database_copy(directory):
+            self.populate(options)
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            self.explain_pages()
+
+    def populate(self, options):
+        """Создаёт пользователей, категории, места, посты и комментарии."""
+        now = timezone.now()
+        users = User.objects.bulk_create(
+            User(username=f'bench_user_{i}')
+            for i in range(options['users'])
+        )
+        categories = Category.objects.bulk_create(
+            Category(
+                title=f'Категория {i}',
+                description='',
+                slug=f'bench-category-{i}',
+                is_published=bool(i % 10),
+            )
+            for i in range(options['categories'])
+        )
+        locations = Location.objects.bulk_create(
+            Location(name=f'Место {i}') for i in range(options['categories'])
+        )
+        posts = [
+            Post(
+                title=f'Пост {i}',
+                text='Текст публикации. ' * 50,
+                pub_date=now - timedelta(minutes=random.randint(-1440,
+                                                                2 ** 20)),
+                author=random.choice(users),
+                category=random.choice(categories),
+                location=random.choice(locations),
+                is_published=random.random() > 0.05,
+            )
+            for i in range(options['posts'])
+        ]
+        for post in posts:
+            post.is_visible = post.compute_visibility(now)
+            post.excerpt = post.make_excerpt()
+            post.text_html = post.render_text()
+        Post.objects.bulk_create(posts, batch_size=1000)
+        hot_post = posts[0]
+        Comment.objects.bulk_create(
+            (
+                Comment(
+                    post=hot_post if i % 4 == 0 else random.choice(posts),
+                    author=random.choice(users),
+                    text='Комментарий',
+                )
+                for i in range(options['comments'])
+            ),
+            batch_size=1000
+        )
+        self.sample = {
+            'post': hot_post,
+            'category': next(c for c in categories if c.is_published),
+            'author': hot_post.author,
+        }
+        self.stdout.write(
+            f'Создано постов: {len(posts)}, '
+            f'комментариев: {options["comments"]}'
+        )
+
+    def pages(self):
+        """Страницы, запросы которых нужно разобрать."""
+        post = self.sample['post']
+        category = self.sample['category']
+        author = self.sample['author']
+        return (
+            ('Главная', '/', None),
+            ('Главная, страница 50', '/?page=50', None),
+            ('Категория', f'/category/{category.slug}/', None),
+            ('Профиль (гость)', f'/profile/{author.username}/', None),
+            ('Профиль (автор)', f'/profile/{author.username}/', author),
+            ('Пост с комментариями', f'/posts/{post.pk}/', author),
+        )
+
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def explain_pages(self):
+        for title, url, user in self.pages():
+            client = Client()
+            if user is not None:
+                client.force_login(user)
+            with CaptureQueriesContext(connection) as captured:
+                client.get(url)
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n{title}: {url}'))
+            for query in captured.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT') or 'django_session' in sql:
+                    continue
+                self.explain(sql, query['time'])
+
+    def explain(self, sql, duration):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = [row[-1] for row in cursor.fetchall()]
+        self.stdout.write(f'  [{duration} с] {sql[:150]}')
+        for step in plan:
+            style = (
+                self.style.WARNING
+                if any(step.startswith(w) for w in PLAN_WARNINGS)
+                else str
+            )
+            self.stdout.write(style(f'      {step}'))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import Post
+from blog.page_cache import invalidate_post_pages
+from core.models import new_version
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сохранённое начало текста постов для карточек.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество постов в одной выборке и одном UPDATE.'
+        )
+
+    def handle(self, *args, batch_size=500, **options):
+        queryset = Post.objects.only('text', 'excerpt').order_by('pk')
+        last_pk = 0
+        fixed = 0
+        while batch := list(queryset.filter(pk__gt=last_pk)[:batch_size]):
+            last_pk = batch[-1].pk
+            changed = []
+            for post in batch:
+                excerpt = post.make_excerpt()
+                if post.excerpt != excerpt:
+                    post.excerpt = excerpt
+                    post.version = new_version()
+                    changed.append(post)
+            if changed:
+                with transaction.atomic():
+                    Post.objects.bulk_update(changed, ['excerpt', 'version'])
+                invalidate_post_pages([post.pk for post in changed])
+            fixed += len(changed)
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено постов: {fixed}'
+        ))
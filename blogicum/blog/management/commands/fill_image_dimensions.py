@@ -0,0 +1,110 @@
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from blog.image_tasks import save_image_meta, schedule_image_release
+from blog.images import normalize_image, oriented_size
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Записывает размеры уже загруженных изображений постов в их '
+        'описание, чтобы шаблоны выводили width и height без чтения файлов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--strip',
+            action='store_true',
+            help=(
+                'Заодно повернуть оригиналы по EXIF и удалить из них '
+                'метаданные, как при новой загрузке. Очищенные файлы '
+                'получают новые имена, после этого запустите '
+                'build_image_variants.'
+            )
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество постов, выбираемых из базы за раз.'
+        )
+
+    def handle(self, *args, **options):
+        self.storage = Post._meta.get_field('image').storage
+        queryset = (
+            Post.objects.exclude(image='').exclude(image__isnull=True)
+            .order_by('pk')
+        )
+        if not options['strip']:
+            queryset = queryset.exclude(image_meta__has_key='width')
+        queryset = queryset.values_list('pk', 'image', 'image_meta')
+        updated = failed = 0
+        last_pk = 0
+        # Посты дальше курсора, уже переведённые на очищенный файл вместе
+        # с другим постом: их строки в следующих пачках пропускаются.
+        moved = set()
+        while rows := list(
+            queryset.filter(pk__gt=last_pk)[:options['batch_size']]
+        ):
+            last_pk = rows[-1][0]
+            measured = {}
+            for pk, source, meta in rows:
+                if pk in moved:
+                    continue
+                if source not in measured:
+                    try:
+                        measured[source] = self.measure(
+                            source, options['strip']
+                        )
+                    except (OSError, Image.DecompressionBombError) as error:
+                        measured[source] = None
+                        self.stderr.write(f'{source}: {error}')
+                if measured[source] is None:
+                    failed += 1
+                    continue
+                updated += self.save(pk, source, meta, *measured[source])
+                moved.update(measured[source][2])
+            moved = {pk for pk in moved if pk > last_pk}
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено постов: {updated}, с ошибками: {failed}'
+        ))
+
+    def save(self, pk, source, meta, name, size, moved):
+        """Записывает размеры посту или всем постам, переведённым на name.
+
+        Возвращает количество обновлённых постов.
+        """
+        width, height = size
+        if name == source:
+            return save_image_meta(
+                pk, name, {**meta, 'width': width, 'height': height}
+            )
+        return sum(
+            save_image_meta(post_pk, name, {'width': width, 'height': height})
+            for post_pk in moved
+        )
+
+    def measure(self, source, strip):
+        """Имя файла, размеры изображения и посты, переведённые на файл.
+
+        При strip очищенное изображение сохраняется под новым именем
+        по хэшу, посты переводятся на него, а прежний файл освобождается.
+        """
+        with self.storage.open(source) as file:
+            if not strip:
+                with Image.open(file) as image:
+                    return source, oriented_size(image), ()
+            data, size = normalize_image(file)
+        if data is None:
+            return source, size, ()
+        name = self.storage.save(source, ContentFile(data))
+        if name == source:
+            return source, size, ()
+        pks = list(
+            Post.objects.filter(image=source).values_list('pk', flat=True)
+        )
+        Post.objects.filter(pk__in=pks).update(image=name)
+        schedule_image_release(source)
+        return name, size, pks
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from blog.scheduler import publish_due_posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Открывает отложенные посты, время публикации которых наступило. '
+        'Подходит для запуска по cron, если фоновый планировщик выключен.'
+    )
+
+    def handle(self, *args, **options):
+        published = publish_due_posts()
+        self.stdout.write(self.style.SUCCESS(
+            f'Открыто отложенных постов: {published}'
+        ))
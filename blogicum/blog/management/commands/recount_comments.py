@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from blog.models import Comment, Post
+from blog.page_cache import invalidate_post_pages
+from core.models import new_version
+
+
+class Command(BaseCommand):
+    help = 'Сверяет и исправляет сохранённые счётчики комментариев постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не изменяя.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество постов в одном UPDATE.'
+        )
+
+    def handle(self, *args, dry_run=False, batch_size=500, **options):
+        actual = (
+            Comment.objects
+            .filter(post=OuterRef('pk'))
+            .order_by()
+            .values('post')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        drifted = (
+            Post.objects
+            .annotate(actual=Coalesce(
+                Subquery(actual, output_field=IntegerField()), 0
+            ))
+            .exclude(comment_count=F('actual'))
+            .values_list('pk', 'comment_count', 'actual')
+        )
+        fixed = []
+        version = new_version()
+        for pk, stored, real in drifted.iterator():
+            self.stdout.write(f'Пост {pk}: сохранено {stored}, на деле {real}')
+            fixed.append(Post(pk=pk, comment_count=real, version=version))
+        if not dry_run and fixed:
+            with transaction.atomic():
+                Post.objects.bulk_update(
+                    fixed, ['comment_count', 'version'],
+                    batch_size=batch_size
+                )
+            invalidate_post_pages([post.pk for post in fixed])
+        verb = 'Найдено' if dry_run else 'Исправлено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} расхождений: {len(fixed)}'
+        ))
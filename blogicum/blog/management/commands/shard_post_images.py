@@ -0,0 +1,134 @@
+import os
+import posixpath
+import shutil
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from blog.images import VARIANTS_ROOT, delete_variants
+from blog.models import Post
+from blog.page_cache import invalidate_post_pages
+from core.models import new_version
+
+
+def link_or_copy(source, destination):
+    """Жёсткая ссылка на файл, а на другом разделе — копия."""
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    try:
+        os.link(source, destination)
+    except FileExistsError:
+        pass
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def rename_meta(meta, old_name, new_name):
+    """Описание вариантов с путями, переведёнными на новое имя файла."""
+    if meta.get('source') != old_name:
+        return meta
+    old_prefix = posixpath.join(VARIANTS_ROOT, old_name, '')
+    new_prefix = posixpath.join(VARIANTS_ROOT, new_name, '')
+    return {
+        **meta,
+        'source': new_name,
+        'variants': {
+            variant: {
+                **description,
+                'files': {
+                    fmt: new_prefix + file.removeprefix(old_prefix)
+                    for fmt, file in description['files'].items()
+                },
+            }
+            for variant, description in meta['variants'].items()
+        },
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит изображения постов в раскладку хранилища по хэшу '
+        'содержимого с подкаталогами и пакетно переписывает пути в постах.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество файлов, переносимых за одну транзакцию.'
+        )
+
+    def handle(self, *args, **options):
+        self.storage = Post._meta.get_field('image').storage
+        try:
+            self.storage.path('')
+            default_storage.path('')
+        except NotImplementedError:
+            raise CommandError('Перенос возможен только на локальном диске.')
+        names = (
+            Post.objects.exclude(image='').exclude(image__isnull=True)
+            .order_by('image').values_list('image', flat=True).distinct()
+        )
+        moved = missing = 0
+        last_name = ''
+        while batch := list(
+            names.filter(image__gt=last_name)[:options['batch_size']]
+        ):
+            last_name = batch[-1]
+            renames = {}
+            for name in batch:
+                if self.storage.is_hashed(name):
+                    continue
+                if not self.storage.exists(name):
+                    missing += 1
+                    self.stderr.write(f'{name}: файл не найден')
+                    continue
+                renames[name] = self.link(name)
+            if renames:
+                self.rewrite(renames)
+                moved += len(renames)
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено файлов: {moved}, не найдено: {missing}'
+        ))
+
+    def link(self, name):
+        """Ссылается на файл и его варианты по новым путям.
+
+        Старые файлы удаляются только после того, как посты переведены
+        на новые пути, поэтому прерванный перенос ничего не ломает.
+        """
+        with self.storage.open(name) as file:
+            new_name = self.storage.hashed_name(name, file)
+        link_or_copy(self.storage.path(name), self.storage.path(new_name))
+        variants = default_storage.path(os.path.join(VARIANTS_ROOT, name))
+        if os.path.isdir(variants):
+            target = default_storage.path(
+                os.path.join(VARIANTS_ROOT, new_name)
+            )
+            for entry in os.scandir(variants):
+                link_or_copy(entry.path, os.path.join(target, entry.name))
+        return new_name
+
+    def rewrite(self, renames):
+        """Переписывает пути в постах и удаляет файлы по старым путям."""
+        posts = list(
+            Post.objects.filter(image__in=renames)
+            .only('pk', 'image', 'image_meta')
+        )
+        version = new_version()
+        for post in posts:
+            old_name = post.image.name
+            post.image = renames[old_name]
+            post.image_meta = rename_meta(
+                post.image_meta, old_name, renames[old_name]
+            )
+            post.version = version
+        with transaction.atomic():
+            Post.objects.bulk_update(
+                posts, ('image', 'image_meta', 'version'), batch_size=500
+            )
+        for old_name in renames:
+            self.storage.delete(old_name)
+            delete_variants(old_name)
+        invalidate_post_pages([post.pk for post in posts])
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-17 06:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='Версия'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='Версия'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.1 on 2026-10-17 06:50
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+
+def fill_excerpt(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    queryset = Post.objects.only('text').order_by('pk')
+    last_pk = 0
+    while posts := list(queryset.filter(pk__gt=last_pk)[:500]):
+        for post in posts:
+            post.excerpt = Truncator(
+                Truncator(post.text).words(10, truncate=' …')
+            ).chars(256)
+        Post.objects.bulk_update(posts, ['excerpt'])
+        last_pk = posts[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_post_is_visible'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, help_text='Первые слова текста для карточки поста в лентах.', max_length=256, verbose_name='Начало текста'),
+        ),
+        migrations.RunPython(fill_excerpt, migrations.RunPython.noop),
+    ]
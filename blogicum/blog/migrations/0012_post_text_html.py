@@ -0,0 +1,31 @@
+# Generated by Django 5.1.1 on 2026-10-17 06:52
+
+from django.db import migrations, models
+from django.template.defaultfilters import linebreaksbr
+
+
+def fill_text_html(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    queryset = Post.objects.only('text').order_by('pk')
+    last_pk = 0
+    while posts := list(queryset.filter(pk__gt=last_pk)[:500]):
+        for post in posts:
+            post.text_html = linebreaksbr(post.text, autoescape=True)
+        Post.objects.bulk_update(posts, ['text_html'])
+        last_pk = posts[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_post_excerpt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, help_text='Текст, подготовленный для страницы поста.', verbose_name='HTML текста'),
+        ),
+        migrations.RunPython(fill_text_html, migrations.RunPython.noop),
+    ]
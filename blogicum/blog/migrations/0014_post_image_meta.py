@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-17 07:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_meta',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Размеры и файлы уменьшенных копий изображения.', verbose_name='Варианты изображения'),
+        ),
+    ]
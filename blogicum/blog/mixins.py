@@ -1,8 +1,16 @@
+from django.conf import settings
+from django.core.cache import cache
 from django.urls import reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.shortcuts import get_object_or_404
+from django.shortcuts import redirect
 
-from .models import Comment
+from .fragments import render_comment_bodies, render_post_cards
+from .identity_map import get_object_once
+from .models import Comment, Post
+from .page_cache import (
+    conditional_page, get_page_generations, page_cache_key, store_page
+)
+from .paginators import KeysetPaginator, get_page
 
 
 class CommentSecurityMixin(LoginRequiredMixin):
@@ -21,14 +29,138 @@ class CommentSecurityMixin(LoginRequiredMixin):
     def dispatch(self, request, *args, **kwargs):
         """Проверка прав доступа перед обработкой запроса."""
         comment = self.get_object()
-        if comment.author != request.user:
+        if comment.author_id != request.user.id:
             return self.handle_no_permission()
         return super().dispatch(request, *args, **kwargs)
 
-    def get_object(self):
+    def get_object(self, queryset=None):
         """Получение комментария с проверкой принадлежности к посту."""
-        return get_object_or_404(
-            Comment,
+        return get_object_once(
+            self.request,
+            Comment.objects.all(),
             pk=self.kwargs['comment_id'],
             post_id=self.kwargs['post_id']
         )
+
+
+class PostAuthorMixin(LoginRequiredMixin):
+    """Миксин действий с постом, доступных только его автору."""
+
+    model = Post
+    pk_url_kwarg = 'post_id'
+
+    def dispatch(self, request, *args, **kwargs):
+        """Проверяет, что пользователь - автор поста."""
+        if self.get_object().author_id != request.user.id:
+            return redirect('blog:post_detail', post_id=self.kwargs['post_id'])
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_object(self, queryset=None):
+        """Получает пост один раз за запрос."""
+        return get_object_once(
+            self.request,
+            Post.objects.select_related('author', 'category', 'location'),
+            pk=self.kwargs['post_id']
+        )
+
+
+class KeysetPaginationMixin:
+    """Миксин пагинации ленты по курсору вместо LIMIT/OFFSET."""
+
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        """Выбирает страницу по курсору или по номеру для старых ссылок.
+
+        Вместо списка объектов возвращается сама страница: она попадает
+        в контекст под именем page_obj и даёт шаблону ссылки навигации.
+        """
+        page = get_page(
+            self.request,
+            queryset,
+            page_size,
+            page_kwarg=self.page_kwarg,
+            cursor_kwarg=self.cursor_kwarg
+        )
+        return page.paginator, page, page, page.has_other_pages()
+
+
+class CommentsPageMixin:
+    """Миксин страницы комментариев поста по курсору (created_at, id)."""
+
+    comments_per_page = settings.COMMENTS_PER_PAGE
+    cursor_kwarg = 'cursor'
+
+    def get_comments_page(self, cursor=None):
+        """Страница комментариев с готовым HTML их текстов."""
+        paginator = KeysetPaginator(
+            self.object.comments.select_related('author'),
+            self.comments_per_page,
+            ordering=('created_at', 'id')
+        )
+        page = paginator.get_page(cursor)
+        render_comment_bodies(page)
+        return page
+
+
+class PostCardsMixin:
+    """Миксин, подставляющий в ленту закэшированные карточки постов."""
+
+    def get_context_data(self, **kwargs):
+        """Добавляет к постам страницы HTML их карточек."""
+        context = super().get_context_data(**kwargs)
+        render_post_cards(context['page_obj'])
+        return context
+
+
+class PageScopesMixin:
+    """Миксин областей данных, от которых зависит страница."""
+
+    page_cache_scopes = ()
+
+    def get_page_cache_scopes(self):
+        """Области данных, при изменении которых страница устаревает."""
+        return self.page_cache_scopes
+
+    def get_page_generations(self):
+        """Поколения областей страницы, один раз за запрос."""
+        if not hasattr(self, '_page_generations'):
+            self._page_generations = get_page_generations(
+                self.get_page_cache_scopes()
+            )
+        return self._page_generations
+
+
+class ConditionalGetMixin(PageScopesMixin):
+    """Миксин ответов 304 Not Modified без рендеринга шаблона."""
+
+    def dispatch(self, request, *args, **kwargs):
+        """Сверяет ETag и Last-Modified с поколениями областей страницы."""
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        decorator = conditional_page(request, self.get_page_generations())
+        return decorator(super().dispatch)(request, *args, **kwargs)
+
+
+class AnonymousPageCacheMixin(PageScopesMixin):
+    """Миксин кэша целых страниц для анонимных GET-запросов."""
+
+    def dispatch(self, request, *args, **kwargs):
+        """Отдаёт страницу из кэша или кэширует свежий ответ."""
+        if (
+            request.method not in ('GET', 'HEAD')
+            or request.user.is_authenticated
+        ):
+            return super().dispatch(request, *args, **kwargs)
+        key = page_cache_key(request, self.get_page_generations())
+        response = cache.get(key)
+        if response is not None:
+            return response
+        response = super().dispatch(request, *args, **kwargs)
+        if getattr(response, 'is_rendered', True):
+            store_page(key, request, response)
+        else:
+            response.add_post_render_callback(
+                lambda rendered: store_page(key, request, rendered)
+            )
+        return response
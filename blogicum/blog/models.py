@@ -1,14 +1,27 @@
+from django.conf import settings
+from django.core.files.storage import storages
 from django.db import models
+from django.template.defaultfilters import linebreaksbr
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.utils.functional import cached_property
+from django.utils.text import Truncator
 
-from core.models import PublishedModel
+from core.models import PublishedModel, VersionedModel
+from .images import ImageSet, normalize_upload
 
 
 MAX_CHAR_FIELD_LENGTH = 256
+EXCERPT_WORDS = 10
 
 User = get_user_model()
 
 
+def get_post_image_storage():
+    """Хранилище изображений постов с именами по хэшу содержимого."""
+    return storages['post_images']
+
+
 class Category(PublishedModel):
     """Модель тематической категории для публикаций."""
 
@@ -34,6 +47,14 @@ class Category(PublishedModel):
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает загруженные флаг публикации и slug категории."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_is_published = instance.__dict__.get('is_published')
+        instance._loaded_slug = instance.__dict__.get('slug')
+        return instance
+
 
 class Location(PublishedModel):
     """Модель географической метки для публикаций."""
@@ -52,7 +73,7 @@ class Location(PublishedModel):
         return self.name
 
 
-class Post(PublishedModel):
+class Post(PublishedModel, VersionedModel):
     """Модель публикации поста в блоге."""
 
     title = models.CharField(
@@ -60,6 +81,19 @@ class Post(PublishedModel):
         verbose_name='Заголовок'
     )
     text = models.TextField(verbose_name='Текст')
+    excerpt = models.CharField(
+        'Начало текста',
+        max_length=MAX_CHAR_FIELD_LENGTH,
+        blank=True,
+        editable=False,
+        help_text='Первые слова текста для карточки поста в лентах.'
+    )
+    text_html = models.TextField(
+        'HTML текста',
+        blank=True,
+        editable=False,
+        help_text='Текст, подготовленный для страницы поста.'
+    )
     pub_date = models.DateTimeField(
         verbose_name='Дата и время публикации',
         help_text=(
@@ -69,10 +103,18 @@ class Post(PublishedModel):
     )
     image = models.ImageField(
         'Изображение',
-        upload_to='posts_images/',
+        upload_to=settings.POST_IMAGE_UPLOAD_DIR,
+        storage=get_post_image_storage,
         blank=True,
         null=True
     )
+    image_meta = models.JSONField(
+        'Варианты изображения',
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text='Размеры и файлы уменьшенных копий изображения.'
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -91,18 +133,123 @@ class Post(PublishedModel):
         null=True,
         verbose_name='Категория'
     )
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False
+    )
+    is_visible = models.BooleanField(
+        'Виден читателям',
+        default=False,
+        editable=False,
+        help_text=(
+            'Пост и категория опубликованы, время публикации наступило.'
+        )
+    )
 
     class Meta:
         verbose_name = 'публикация'
         verbose_name_plural = 'Публикации'
         ordering = ('-pub_date',)
         default_related_name = 'posts'
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                condition=models.Q(is_visible=True),
+                name='post_visible_feed_idx'
+            ),
+            models.Index(
+                fields=('category', '-pub_date', '-id'),
+                condition=models.Q(is_visible=True),
+                name='post_visible_category_idx'
+            ),
+            models.Index(
+                fields=('pub_date',),
+                condition=models.Q(is_visible=False, is_published=True),
+                name='post_scheduled_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='post_author_feed_idx'
+            ),
+            models.Index(fields=('image',), name='post_image_idx'),
+        )
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Запоминает загруженное имя файла, чтобы заметить его замену."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_image = instance.__dict__.get('image')
+        return instance
+
+    def compute_visibility(self, now=None):
+        """Должен ли пост сейчас показываться читателям."""
+        return bool(
+            self.is_published
+            and self.category_id is not None
+            and self.category.is_published
+            and self.pub_date <= (now or timezone.now())
+        )
+
+    @cached_property
+    def image_set(self):
+        """Варианты изображения для шаблонов."""
+        return ImageSet(self.image, self.image_meta)
 
-class Comment(models.Model):
+    def make_excerpt(self):
+        """Начало текста, как его показывает карточка поста."""
+        return Truncator(
+            Truncator(self.text).words(EXCERPT_WORDS, truncate=' …')
+        ).chars(MAX_CHAR_FIELD_LENGTH)
+
+    def render_text(self):
+        """HTML текста с экранированием и переводами строк в <br>."""
+        return linebreaksbr(self.text, autoescape=True)
+
+    def save(self, *args, **kwargs):
+        """Пересчитывает видимость, начало текста и его HTML.
+
+        Счётчик комментариев и описание вариантов изображения меняются
+        только атомарными UPDATE из сигналов и обработчика изображений,
+        поэтому при обновлении записи они не сохраняются. Исключение —
+        новая загрузка: она нормализуется, и описание заменяется её
+        размерами.
+        """
+        self.is_visible = self.compute_visibility()
+        uploaded = bool(self.image) and not self.image._committed
+        if uploaded:
+            self.image_meta = normalize_upload(self.image)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'text' in update_fields:
+            self.excerpt = self.make_excerpt()
+            self.text_html = self.render_text()
+        if update_fields:
+            kwargs['update_fields'] = {
+                *update_fields, 'is_visible',
+                *(
+                    ('excerpt', 'text_html')
+                    if 'text' in update_fields else ()
+                ),
+                *(('image_meta',) if 'image' in update_fields else ())
+            }
+        elif (
+            self.pk is not None
+            and not self._state.adding
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in ('comment_count', 'image_meta')
+            ] + (['image_meta'] if uploaded else [])
+        super().save(*args, **kwargs)
+
+
+class Comment(VersionedModel):
     """Модель комментариев постов в блоге."""
 
     post = models.ForeignKey(
@@ -121,6 +268,12 @@ class Comment(models.Model):
     class Meta:
         default_related_name = 'comments'
         ordering = ('created_at',)
+        indexes = (
+            models.Index(
+                fields=('post', 'created_at', 'id'),
+                name='comment_post_created_idx'
+            ),
+        )
         verbose_name = 'комментарий'
         verbose_name_plural = 'Комментарии'
 
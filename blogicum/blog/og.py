@@ -0,0 +1,108 @@
+import hashlib
+import posixpath
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+from .images import encode, flatten
+
+
+OG_ROOT = 'og'
+OG_SIZE = (1200, 630)
+OG_MARGIN = 72
+OG_BACKGROUND = (33, 37, 41)
+OG_TITLE_LINES = 3
+
+
+def og_stamp(post):
+    """Отметка заголовка, категории, автора и файла изображения поста."""
+    parts = (
+        post.title,
+        post.category.title if post.category_id else '',
+        post.author.username,
+        post.image.name or '',
+    )
+    return hashlib.sha256('\0'.join(parts).encode()).hexdigest()[:16]
+
+
+def og_directory(post_id):
+    return posixpath.join(OG_ROOT, str(post_id))
+
+
+def og_image_name(post):
+    """Имя файла превью: меняется вместе с отметкой полей поста."""
+    return posixpath.join(og_directory(post.pk), f'{og_stamp(post)}.jpg')
+
+
+def load_font(size):
+    """Шрифт из настроек, а если его нет в системе — встроенный в Pillow."""
+    try:
+        return ImageFont.truetype(settings.OG_IMAGE_FONT, size)
+    except OSError:
+        return ImageFont.load_default(size)
+
+
+def wrap_text(draw, text, font, width, max_lines):
+    """Разбивает текст на строки по ширине, обрезая лишнее многоточием."""
+    lines = []
+    for word in text.split():
+        candidate = f'{lines[-1]} {word}' if lines else word
+        if lines and draw.textlength(candidate, font=font) <= width:
+            lines[-1] = candidate
+        else:
+            lines.append(word)
+    if len(lines) > max_lines:
+        lines = lines[:max_lines]
+        lines[-1] += ' …'
+    for index, line in enumerate(lines):
+        while draw.textlength(line, font=font) > width and len(line) > 1:
+            line = line[:-2] + '…'
+        lines[index] = line
+    return lines
+
+
+def open_background(post, storage=default_storage):
+    """Изображение поста, обрезанное под размер превью, или None.
+
+    Берётся самый крупный готовый вариант, а до их создания — оригинал.
+    """
+    if not post.image:
+        return None
+    source = post.image.name
+    meta = post.image_meta or {}
+    if meta.get('source') == source and 'retina' in meta['variants']:
+        source = meta['variants']['retina']['files']['jpeg']
+    with storage.open(source) as file:
+        image = Image.open(file)
+        image.draft('RGB', OG_SIZE)
+        image = flatten(ImageOps.exif_transpose(image))
+    image = ImageOps.fit(image, OG_SIZE, Image.Resampling.LANCZOS)
+    return Image.blend(image, Image.new('RGB', OG_SIZE, (0, 0, 0)), 0.55)
+
+
+def render_og_image(post, storage=default_storage):
+    """JPEG превью поста для соцсетей размером 1200x630."""
+    canvas = open_background(post, storage) or Image.new(
+        'RGB', OG_SIZE, OG_BACKGROUND
+    )
+    draw = ImageDraw.Draw(canvas)
+    width = OG_SIZE[0] - OG_MARGIN * 2
+    title_font = load_font(64)
+    caption_font = load_font(34)
+    caption = f'@{post.author.username}'
+    if post.category_id:
+        caption = f'{post.category.title} · {caption}'
+    y = OG_SIZE[1] - OG_MARGIN - 34
+    draw.text(
+        (OG_MARGIN, y),
+        wrap_text(draw, caption, caption_font, width, 1)[0],
+        font=caption_font,
+        fill=(206, 212, 218)
+    )
+    lines = wrap_text(draw, post.title, title_font, width, OG_TITLE_LINES)
+    y -= 32 + 76 * len(lines)
+    for line in lines:
+        draw.text((OG_MARGIN, y), line, font=title_font, fill='white')
+        y += 76
+    return encode(canvas)
@@ -0,0 +1,133 @@
+import hashlib
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.views.decorators.http import condition
+
+from core.models import new_version
+from .models import Category, Post
+
+
+SCOPE_ALL = 'all'
+SCOPE_INDEX = 'index'
+
+
+def category_scope(slug):
+    return f'category:{slug}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def _generation_key(scope):
+    return f'blog:page-generation:{scope}'
+
+
+def get_generations(scopes):
+    """Текущие поколения областей; отсутствующие создаются.
+
+    Поколение живёт PAGE_GENERATION_TIMEOUT секунд. Вытесненное или
+    истёкшее поколение заменяется новым, то есть страницы лишь лишний
+    раз рендерятся заново. Если поколение одновременно создают несколько
+    процессов, остаётся записанное первым.
+    """
+    keys = [_generation_key(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    missing = [key for key in keys if key not in generations]
+    for key in missing:
+        cache.add(key, new_version(), settings.PAGE_GENERATION_TIMEOUT)
+    if missing:
+        generations.update(cache.get_many(missing))
+    return [generations[key] for key in keys]
+
+
+def invalidate(*scopes):
+    """Сбрасывает все страницы, зависящие от перечисленных областей."""
+    cache.set_many(
+        {_generation_key(scope): new_version() for scope in scopes},
+        settings.PAGE_GENERATION_TIMEOUT
+    )
+
+
+def get_page_generations(scopes):
+    """Поколения областей страницы вместе с общей областью всех страниц."""
+    return get_generations((SCOPE_ALL, *scopes))
+
+
+def page_cache_key(request, generations):
+    """Ключ страницы: поколения её областей и полный путь с query string."""
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return 'blog:page:{}:{}'.format(
+        '.'.join(str(generation) for generation in generations), path
+    )
+
+
+def store_page(key, request, response):
+    """Сохраняет ответ, если он общий для всех анонимных читателей.
+
+    Страницы с формами (использован CSRF-токен) и ответы с cookies
+    в кэш не попадают.
+    """
+    if (
+        response.status_code == 200
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    ):
+        cache.set(key, response, settings.PAGE_CACHE_TIMEOUT)
+
+
+def page_validators(request, generations):
+    """Значение ETag и время изменения страницы по поколениям областей.
+
+    Страница вошедшего пользователя содержит его имя и CSRF-токен,
+    который меняется при каждом входе, поэтому её ETag зависит
+    от пользователя и его сессии.
+    """
+    parts = [*generations]
+    if request.user.is_authenticated:
+        parts += [request.user.pk, request.session.session_key]
+    etag = hashlib.md5(
+        ':'.join(str(part) for part in parts).encode()
+    ).hexdigest()
+    last_modified = datetime.fromtimestamp(
+        max(generations) // 10 ** 9, timezone.utc
+    )
+    return etag, last_modified
+
+
+def conditional_page(request, generations):
+    """Декоратор view, отвечающий 304, если поколения не изменились."""
+    etag, last_modified = page_validators(request, generations)
+    return condition(
+        etag_func=lambda *args, **kwargs: etag,
+        last_modified_func=lambda *args, **kwargs: last_modified
+    )
+
+
+def invalidate_post_pages(post_ids, category_ids=None, author_ids=None):
+    """Сбрасывает ленту, страницы постов, их категорий и авторов.
+
+    Если категории или авторы не переданы, они определяются по самим постам.
+    """
+    categories = Category.objects.all()
+    if category_ids is None:
+        categories = categories.filter(posts__in=post_ids)
+    else:
+        categories = categories.filter(pk__in=category_ids)
+    slugs = categories.values_list('slug', flat=True).distinct()
+    if author_ids is None:
+        author_ids = Post.objects.filter(pk__in=post_ids).values_list(
+            'author_id', flat=True
+        ).distinct()
+    invalidate(
+        SCOPE_INDEX,
+        *(post_scope(post_id) for post_id in post_ids),
+        *(category_scope(slug) for slug in slugs),
+        *(author_scope(author_id) for author_id in author_ids)
+    )
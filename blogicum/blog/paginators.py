@@ -0,0 +1,228 @@
+import base64
+import binascii
+import hashlib
+import json
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+class InvalidCursor(Exception):
+    """Курсор повреждён или не относится к текущей сортировке."""
+
+
+class KeysetPage(Sequence):
+    """Страница ленты, выбранная по ключу сортировки, а не по смещению."""
+
+    is_keyset = True
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<KeysetPage: {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """Пагинатор по ключу сортировки с непрозрачными курсорами.
+
+    Вместо LIMIT/OFFSET каждая страница выбирается условием
+    «строго после (или до) последней показанной записи», поэтому
+    стоимость запроса не растёт с глубиной листания.
+    """
+
+    def __init__(self, object_list, per_page, ordering=('-pub_date', '-id')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = tuple(name.lstrip('-') for name in self.ordering)
+
+    def _field_values(self, obj):
+        return [getattr(obj, name) for name in self.fields]
+
+    def encode_cursor(self, direction, obj):
+        """Упаковывает значения ключа записи в строку для URL."""
+        values = [
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in self._field_values(obj)
+        ]
+        raw = json.dumps([direction, values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Распаковывает курсор в направление и значения ключа."""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            direction, values = json.loads(raw)
+        except (binascii.Error, ValueError, TypeError):
+            raise InvalidCursor(cursor)
+        if direction not in (FORWARD, BACKWARD) or (
+            not isinstance(values, list) or len(values) != len(self.fields)
+        ):
+            raise InvalidCursor(cursor)
+        opts = self.object_list.model._meta
+        try:
+            values = [
+                opts.get_field(name).to_python(value)
+                for name, value in zip(self.fields, values)
+            ]
+        except ValidationError:
+            raise InvalidCursor(cursor)
+        return direction, values
+
+    def _seek(self, values, backward):
+        """Условие «после ключа» в порядке сортировки (или до него)."""
+        condition = Q()
+        equal = Q()
+        for order, name, value in zip(self.ordering, self.fields, values):
+            descending = order.startswith('-')
+            lookup = 'gt' if descending == backward else 'lt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def _reversed_ordering(self):
+        return tuple(
+            order[1:] if order.startswith('-') else f'-{order}'
+            for order in self.ordering
+        )
+
+    def get_page(self, cursor=None):
+        """Возвращает страницу по курсору; битый курсор ведёт на первую."""
+        direction, values = FORWARD, None
+        if cursor:
+            try:
+                direction, values = self.decode_cursor(cursor)
+            except InvalidCursor:
+                pass
+        backward = values is not None and direction == BACKWARD
+        queryset = self.object_list.order_by(
+            *(self._reversed_ordering() if backward else self.ordering)
+        )
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, backward))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backward:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+        if not rows:
+            return KeysetPage(rows, self)
+        return KeysetPage(
+            rows,
+            self,
+            next_cursor=(
+                self.encode_cursor(FORWARD, rows[-1]) if has_next else None
+            ),
+            previous_cursor=(
+                self.encode_cursor(BACKWARD, rows[0])
+                if has_previous else None
+            ),
+        )
+
+
+class FeedPage(Page):
+    """Страница, знающая о следующей странице по пробной лишней записи."""
+
+    def __init__(self, object_list, number, paginator, has_more):
+        super().__init__(object_list, number, paginator)
+        self._has_more = has_more
+
+    def has_next(self):
+        return self._has_more
+
+    @property
+    def page_window(self):
+        """Номера страниц вокруг текущей с многоточиями вместо пропусков."""
+        return list(self.paginator.get_elided_page_range(
+            self.number, on_each_side=2, on_ends=1
+        ))
+
+
+class FeedPaginator(Paginator):
+    """Пагинатор без точного COUNT(*) на каждый просмотр страницы.
+
+    Общее число записей берётся из кэша и нужно только для окна номеров,
+    а наличие следующей страницы определяется выборкой per_page + 1 строк.
+    """
+
+    @cached_property
+    def count(self):
+        sql = str(self.object_list.query)
+        key = f'blog:count:{hashlib.md5(sql.encode()).hexdigest()}'
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, settings.PAGINATOR_COUNT_TIMEOUT)
+        return count
+
+    def validate_number(self, number):
+        """Не сверяет номер с числом страниц: оно может быть устаревшим."""
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            return super().validate_number(number)
+        if number < 1:
+            raise EmptyPage(self.error_messages['min_page'])
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage(self.error_messages['no_results'])
+        return FeedPage(
+            rows[:self.per_page], number, self,
+            has_more=len(rows) > self.per_page
+        )
+
+    def get_page(self, number):
+        """Как в Paginator, но устаревшее число страниц ведёт на первую."""
+        try:
+            return super().get_page(number)
+        except EmptyPage:
+            return self.page(1)
+
+
+def get_page(request, queryset, per_page,
+             page_kwarg='page', cursor_kwarg='cursor'):
+    """Страница ленты: по курсору, а для старых ссылок ?page=N — по номеру."""
+    if page_kwarg in request.GET:
+        return FeedPaginator(queryset, per_page).get_page(
+            request.GET.get(page_kwarg)
+        )
+    return KeysetPaginator(queryset, per_page).get_page(
+        request.GET.get(cursor_kwarg)
+    )
@@ -0,0 +1,99 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .models import Category, Location
+
+
+class ModelRegistry:
+    """Все записи небольшой модели, хранящиеся в памяти процесса.
+
+    Раз в REGISTRY_CHECK_INTERVAL секунд реестр сверяет с базой отметку
+    «последнее изменение и число записей» и перечитывает таблицу, если
+    она изменилась в другом процессе. Изменения в своём процессе
+    сбрасывают реестр сразу, через сигналы.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Забывает записи: при следующем обращении они перечитаются."""
+        self._objects = None
+        self._stamp = None
+        self._checked_at = 0.0
+
+    def _stamp_of(self, objects):
+        return (
+            max((obj.updated_at for obj in objects), default=None),
+            len(objects)
+        )
+
+    def _refresh(self, force=False):
+        objects = self._objects
+        if objects is not None and not force and (
+            time.monotonic() - self._checked_at
+            < settings.REGISTRY_CHECK_INTERVAL
+        ):
+            return objects
+        with self._lock:
+            stamp = None
+            if self._objects is not None:
+                stamp = tuple(self.model.objects.aggregate(
+                    updated=Max('updated_at'), count=Count('pk')
+                ).values())
+            if self._objects is None or stamp != self._stamp:
+                loaded = list(self.model.objects.all())
+                self._stamp = self._stamp_of(loaded)
+                self._objects = {obj.pk: obj for obj in loaded}
+            self._checked_at = time.monotonic()
+            return self._objects
+
+    def all(self):
+        """Все записи в порядке сортировки модели."""
+        return list(self._refresh().values())
+
+    def get(self, pk, fresh=False):
+        """Запись по первичному ключу или None.
+
+        Ключ, которого нет в реестре, перепроверяется по базе: запись
+        могла появиться в другом процессе после последней сверки.
+        """
+        if pk is None:
+            return None
+        obj = self._refresh(force=fresh).get(pk)
+        if obj is None and not fresh:
+            obj = self._refresh(force=True).get(pk)
+        return obj
+
+    def find(self, **attrs):
+        """Первая запись с указанными значениями полей или None."""
+        return next(
+            (
+                obj for obj in self.all()
+                if all(getattr(obj, name) == value
+                       for name, value in attrs.items())
+            ),
+            None
+        )
+
+
+categories = ModelRegistry(Category)
+locations = ModelRegistry(Location)
+
+REGISTRIES = {Category: categories, Location: locations}
+
+
+def attach_categories_and_locations(posts):
+    """Подставляет в посты категории и места из реестров вместо JOIN."""
+    for post in posts:
+        for name, registry in (('category', categories),
+                               ('location', locations)):
+            obj = registry.get(getattr(post, f'{name}_id'))
+            if obj is not None:
+                setattr(post, name, obj)
+    return posts
@@ -0,0 +1,168 @@
+import os
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import locks
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .images import encode, flatten
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def resize_to_fit(
+    source, width, height, fmt='jpeg', storage=default_storage
+):
+    """Оригинал, вписанный в рамку width x height без увеличения.
+
+    Нулевая высота означает, что ограничена только ширина.
+    """
+    box = (width, height or width * 10)
+    with storage.open(source) as file:
+        image = Image.open(file)
+        image.draft('RGB', box)
+        image = flatten(ImageOps.exif_transpose(image))
+    image.thumbnail(box, Image.Resampling.LANCZOS)
+    return encode(image, fmt)
+
+
+class ResizeCache:
+    """Дисковый кэш уменьшенных копий с вытеснением давно не нужных.
+
+    Бюджет max_bytes общий для всех процессов: суммарный размер копий
+    хранится в файле каталога и меняется под блокировкой при каждой
+    записи. Каталог сканируется только при первом учёте и при
+    превышении бюджета; давность использования берётся из mtime копий,
+    который обновляется при каждом попадании. Одновременные запросы
+    одной и той же копии в процессе ждут, пока её построит первый из
+    них, и не декодируют оригинал повторно.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def _path(self, key):
+        return self.directory / key[:2] / key
+
+    def _open(self, key):
+        """Открытая готовая копия или None; отмечает использование.
+
+        Открытый файл читается до конца, даже если другой процесс
+        вытеснит копию раньше, чем будет отдан ответ.
+        """
+        path = self._path(key)
+        try:
+            file = open(path, 'rb')
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return file
+
+    def _store(self, key, data):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_name(
+            f'{key}.{os.getpid()}.{threading.get_ident()}.tmp'
+        )
+        temporary.write_bytes(data)
+        file = open(temporary, 'rb')
+        try:
+            replaced = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+        os.replace(temporary, path)
+        self._account(len(data) - replaced, keep=path)
+        return file
+
+    def _account(self, delta, keep):
+        """Прибавляет delta к общему размеру и вытесняет копии сверх него."""
+        descriptor = os.open(
+            self.directory / 'size', os.O_RDWR | os.O_CREAT, 0o644
+        )
+        with open(descriptor, 'r+b') as file:
+            locks.lock(file, locks.LOCK_EX)
+            try:
+                recorded = file.read()
+                if recorded:
+                    total = int(recorded) + delta
+                else:
+                    total = sum(size for _, size, _ in self._scan())
+                if total > self.max_bytes:
+                    total = self._evict(keep)
+                file.seek(0)
+                file.truncate()
+                file.write(str(total).encode())
+            finally:
+                locks.unlock(file)
+
+    def _scan(self):
+        """Копии каталога как (mtime, размер, путь)."""
+        files = []
+        for path in self.directory.glob('*/*'):
+            if path.suffix == '.tmp':
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime_ns, stat.st_size, path))
+        return files
+
+    def _evict(self, keep):
+        """Удаляет давно не использованные копии; возвращает новый размер.
+
+        Копии удаляются до 90% бюджета, чтобы следующие записи не
+        сканировали каталог заново.
+        """
+        files = sorted(self._scan())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_bytes * 9 // 10:
+                break
+            if path == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+        return total
+
+    def open_or_create(self, key, build):
+        """Открытый файл копии; build() вызывается один раз на ключ."""
+        file = self._open(key)
+        if file is not None:
+            return file
+        with self._lock:
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+        if not leader:
+            event.wait(settings.IMAGE_RESIZE_WAIT_TIMEOUT)
+            return self._open(key) or self._store(key, build())
+        try:
+            return self._open(key) or self._store(key, build())
+        finally:
+            with self._lock:
+                self._inflight.pop(key).set()
+
+
+def get_resize_cache():
+    """Кэш копий для каталога и бюджета из текущих настроек."""
+    directory = str(settings.IMAGE_RESIZE_CACHE_DIR)
+    with _caches_lock:
+        cache = _caches.get(directory)
+        if cache is None:
+            cache = _caches[directory] = ResizeCache(
+                directory, settings.IMAGE_RESIZE_CACHE_BYTES
+            )
+        cache.max_bytes = settings.IMAGE_RESIZE_CACHE_BYTES
+    return cache
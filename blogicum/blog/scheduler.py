@@ -0,0 +1,108 @@
+import logging
+import threading
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from core.models import new_version
+from .models import Post
+from .page_cache import invalidate_post_pages
+
+
+logger = logging.getLogger(__name__)
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def bucketed_now(now=None, bucket=None):
+    """Текущее время, округлённое вниз до границы интервала.
+
+    Все процессы, опрашивающие ленту в пределах одного интервала,
+    получают одно и то же значение.
+    """
+    now = now or timezone.now()
+    bucket = settings.FEED_TIME_BUCKET if bucket is None else bucket
+    if not bucket:
+        return now
+    timestamp = now.timestamp() // bucket * bucket
+    return datetime.fromtimestamp(timestamp, dt_timezone.utc)
+
+
+def seconds_to_next_bucket(now=None, bucket=None):
+    """Сколько секунд осталось до начала следующего интервала."""
+    now = now or timezone.now()
+    bucket = settings.FEED_TIME_BUCKET if bucket is None else bucket
+    return bucket - now.timestamp() % bucket
+
+
+def publish_due_posts(now=None, batch_size=500):
+    """Делает видимыми отложенные посты, время публикации которых пришло.
+
+    По умолчанию сравнивает с началом текущего интервала, поэтому
+    отложенный пост открывается не позже чем через интервал.
+    Возвращает количество открытых постов.
+    """
+    due = Post.objects.filter(
+        is_visible=False,
+        is_published=True,
+        category__is_published=True,
+        pub_date__lte=now or bucketed_now()
+    ).order_by('pub_date').values_list('pk', flat=True)
+    published = 0
+    while post_ids := list(due[:batch_size]):
+        Post.objects.filter(pk__in=post_ids).update(
+            is_visible=True, version=new_version()
+        )
+        invalidate_post_pages(post_ids)
+        published += len(post_ids)
+    return published
+
+
+class VisibilityScheduler(threading.Thread):
+    """Фоновый поток, открывающий отложенные посты на границах интервалов.
+
+    Потоки всех процессов просыпаются одновременно. Посты открывает
+    и сбрасывает страницы тот процесс, чей UPDATE их изменил; сброс
+    идёт через общий кэш, поэтому виден всем процессам, а остальные
+    планировщики ничего не находят. Страницы сбрасываются не чаще
+    одного раза за интервал.
+    """
+
+    def __init__(self, interval):
+        super().__init__(name='post-visibility-scheduler', daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(
+            seconds_to_next_bucket(bucket=self.interval)
+        ):
+            try:
+                published = publish_due_posts(
+                    now=bucketed_now(bucket=self.interval)
+                )
+                if published:
+                    logger.info('Открыто отложенных постов: %s', published)
+            except Exception:
+                logger.exception('Не удалось открыть отложенные посты')
+            finally:
+                connections.close_all()
+
+    def stop(self):
+        self.stopped.set()
+
+
+def start_scheduler():
+    """Запускает планировщик в процессе веб-сервера, если он включён."""
+    global _scheduler
+    interval = settings.FEED_TIME_BUCKET
+    if not interval:
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = VisibilityScheduler(interval)
+            _scheduler.start()
+    return _scheduler
@@ -0,0 +1,228 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import BooleanField, ExpressionWrapper, F, Q
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import new_version
+from .image_tasks import (
+    delete_og_images, schedule_image_release, schedule_og_image,
+    schedule_post_image
+)
+from .models import Category, Comment, Location, Post
+from .page_cache import (
+    SCOPE_ALL, category_scope, invalidate, invalidate_post_pages
+)
+from .registry import REGISTRIES
+
+
+User = get_user_model()
+
+# Посты, которые удаляются в этом потоке прямо сейчас: их комментарии
+# удаляются каскадом, и пересчитывать счётчик и сбрасывать страницы
+# ради каждого из них незачем.
+_deleting = threading.local()
+
+
+def deleting_posts():
+    if not hasattr(_deleting, 'posts'):
+        _deleting.posts = set()
+    return _deleting.posts
+
+
+@receiver(pre_delete, sender=Post)
+def remember_deleting_post(sender, instance, **kwargs):
+    """Отмечает пост, комментарии которого сейчас удалятся каскадом."""
+    deleting_posts().add(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def forget_deleted_post(sender, instance, **kwargs):
+    deleting_posts().discard(instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, **kwargs):
+    """Увеличивает счётчик комментариев поста при добавлении комментария."""
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1,
+            version=new_version()
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, **kwargs):
+    """Уменьшает счётчик комментариев поста при удалении комментария."""
+    if instance.post_id in deleting_posts():
+        return
+    Post.objects.filter(
+        pk=instance.post_id, comment_count__gt=0
+    ).update(comment_count=F('comment_count') - 1, version=new_version())
+
+
+@receiver(post_save, sender=Category)
+def refresh_category_visibility(sender, instance, created, update_fields,
+                                **kwargs):
+    """Пересчитывает видимость постов при смене публикации категории.
+
+    Если флаг публикации не изменился, например при правке заголовка,
+    посты категории не переписываются.
+    """
+    if update_fields and 'is_published' not in update_fields:
+        return
+    loaded = getattr(instance, '_loaded_is_published', None)
+    instance._loaded_is_published = instance.is_published
+    if created or loaded == instance.is_published:
+        return
+    visible = False
+    if instance.is_published:
+        visible = ExpressionWrapper(
+            Q(is_published=True, pub_date__lte=timezone.now()),
+            output_field=BooleanField()
+        )
+    Post.objects.filter(category=instance).update(is_visible=visible)
+
+
+@receiver(pre_delete, sender=Category)
+def hide_category_posts(sender, instance, **kwargs):
+    """Скрывает посты удаляемой категории: они остаются без категории."""
+    Post.objects.filter(category=instance).update(is_visible=False)
+
+
+@receiver(post_save, sender=User)
+def bump_author_fragments(sender, instance, created, update_fields,
+                          **kwargs):
+    """Сбрасывает карточки и комментарии автора при смене его данных.
+
+    Обновление одного last_login при входе на сайт фрагменты не меняет.
+    """
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    version = new_version()
+    Post.objects.filter(author=instance).update(version=version)
+    Comment.objects.filter(author=instance).update(version=version)
+    invalidate(SCOPE_ALL)
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_category(sender, instance, **kwargs):
+    """Запоминает прежнюю категорию поста, чтобы сбросить и её страницы."""
+    instance._previous_category_id = (
+        Post.objects.filter(pk=instance.pk)
+        .values_list('category_id', flat=True)
+        .first()
+        if instance.pk is not None else None
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_cache(sender, instance, **kwargs):
+    """Сбрасывает страницы, на которых показан пост."""
+    previous_category_id = getattr(instance, '_previous_category_id', None)
+    invalidate_post_pages(
+        [instance.pk],
+        {instance.category_id, previous_category_id},
+        [instance.author_id]
+    )
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_cache(sender, instance, **kwargs):
+    """Сбрасывает страницу поста и ленты с его счётчиком комментариев."""
+    if instance.post_id in deleting_posts():
+        return
+    invalidate_post_pages([instance.post_id])
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Location)
+def remember_related_posts(sender, instance, **kwargs):
+    """Запоминает посты удаляемой категории или места до обнуления ссылок."""
+    instance._post_ids = list(instance.posts.values_list('pk', flat=True))
+
+
+def related_post_ids(instance):
+    """Посты категории или места; при удалении — запомненные заранее."""
+    post_ids = instance.__dict__.pop('_post_ids', None)
+    if post_ids is None:
+        post_ids = list(instance.posts.values_list('pk', flat=True))
+    return post_ids
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_pages(sender, instance, **kwargs):
+    """Сбрасывает страницы категории, её постов и ленты с их карточками.
+
+    Если сменился slug, сбрасывается и страница по прежнему адресу.
+    """
+    slugs = {instance.slug, getattr(instance, '_loaded_slug', None)}
+    invalidate_post_pages(related_post_ids(instance), category_ids=())
+    invalidate(*(category_scope(slug) for slug in slugs if slug))
+    instance._loaded_slug = instance.slug
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_location_pages(sender, instance, **kwargs):
+    """Сбрасывает страницы постов места и ленты с их карточками."""
+    post_ids = related_post_ids(instance)
+    if post_ids:
+        invalidate_post_pages(post_ids)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def reset_registry(sender, instance, **kwargs):
+    """Перечитывает реестр категорий или мест в этом процессе."""
+    REGISTRIES[sender].clear()
+
+
+@receiver(post_save, sender=Post)
+def schedule_image_variants(sender, instance, **kwargs):
+    """Ставит в очередь создание вариантов нового изображения поста."""
+    if instance.image and (
+        instance.image_meta.get('source') != instance.image.name
+    ):
+        schedule_post_image(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def release_replaced_image(sender, instance, **kwargs):
+    """Освобождает прежний файл изображения, если пост сменил его."""
+    if 'image' in instance.get_deferred_fields():
+        return
+    loaded = getattr(instance, '_loaded_image', None)
+    if loaded and loaded != instance.image.name:
+        schedule_image_release(loaded)
+    instance._loaded_image = instance.image.name
+
+
+@receiver(post_delete, sender=Post)
+def release_deleted_image(sender, instance, **kwargs):
+    """Освобождает файл изображения удалённого поста."""
+    if instance.image:
+        schedule_image_release(instance.image.name)
+
+
+@receiver(post_save, sender=Post)
+def schedule_post_og_image(sender, instance, **kwargs):
+    """Обновляет превью поста для соцсетей после его сохранения."""
+    schedule_og_image(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def delete_post_og_images(sender, instance, **kwargs):
+    """Удаляет превью удалённого поста."""
+    post_id = instance.pk
+    transaction.on_commit(lambda: delete_og_images(post_id))
@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+
+
+# Начальные байты форматов изображений, которые принимаются к загрузке.
+IMAGE_SIGNATURES = (
+    (0, b'\xff\xd8\xff'),
+    (0, b'\x89PNG\r\n\x1a\n'),
+    (0, b'GIF87a'),
+    (0, b'GIF89a'),
+    (8, b'WEBP'),
+)
+HEADER_SIZE = 12
+
+
+def looks_like_image(header):
+    """Похожи ли первые байты файла на изображение известного формата."""
+    return any(
+        header[offset:offset + len(signature)] == signature
+        for offset, signature in IMAGE_SIGNATURES
+    )
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """Потоковая загрузка во временный файл с ранней отсечкой.
+
+    Файл не пишется на диск дальше первых байтов, если они не похожи
+    на изображение, и дальше POST_IMAGE_MAX_UPLOAD_SIZE. Остаток запроса
+    дочитывается без сохранения, а форма получает пустой файл с причиной
+    отказа в атрибуте upload_error.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.upload_error = None
+        self.header = b''
+        self.received = 0
+        if (
+            self.content_length
+            and self.content_length > settings.POST_IMAGE_MAX_UPLOAD_SIZE
+        ):
+            self.upload_error = 'too_large'
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.upload_error:
+            return None
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_UPLOAD_SIZE:
+            return self.reject('too_large')
+        if len(self.header) < HEADER_SIZE:
+            self.header += raw_data[:HEADER_SIZE]
+            if len(self.header) >= HEADER_SIZE and not looks_like_image(
+                self.header
+            ):
+                return self.reject('not_image')
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if not self.upload_error and not looks_like_image(self.header):
+            self.reject('not_image')
+        file = super().file_complete(file_size)
+        file.upload_error = self.upload_error
+        if self.upload_error:
+            file.size = 0
+        return file
+
+    def reject(self, reason):
+        """Отказывает в загрузке и освобождает уже записанное место."""
+        self.upload_error = reason
+        self.file.seek(0)
+        self.file.truncate()
+        return None
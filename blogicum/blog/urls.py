@@ -1,10 +1,10 @@
 from django.urls import include, path
 
 from .views import (
-    PostListView, PostDetailView, CategoryPostsView,
+    PostListView, PostDetailView, PostCommentsView, CategoryPostsView,
     PostCreateView, PostUpdateView, PostDeleteView,
     CommentCreateView, CommentUpdateView, CommentDeleteView,
-    profile_view, edit_profile
+    profile_view, edit_profile, resize_image
 )
 
 app_name = 'blog'
@@ -18,6 +18,11 @@ post_urls = [
         PostDeleteView.as_view(),
         name='delete_post'
     ),
+    path(
+        '<int:post_id>/comments/',
+        PostCommentsView.as_view(),
+        name='post_comments'
+    ),
     path(
         '<int:post_id>/comment/',
         CommentCreateView.as_view(),
@@ -44,5 +49,10 @@ urlpatterns = [
     ),
     path('profile/<str:username>/', profile_view, name='profile'),
     path('edit_profile/', edit_profile, name='edit_profile'),
-    path('posts/', include(post_urls))
+    path('posts/', include(post_urls)),
+    path(
+        'media/resize/<int:width>x<int:height>/<path:path>',
+        resize_image,
+        name='resize_image'
+    ),
 ]
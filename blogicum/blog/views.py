@@ -1,110 +1,182 @@
+import hashlib
+
 from django.views.generic import (
     ListView, DetailView, CreateView, UpdateView, DeleteView
 )
 from django.urls import reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.shortcuts import get_object_or_404, redirect, render
-from django.utils import timezone
-from django.db.models import Count
-from django.core.paginator import Paginator
-from django.http import Http404
+from django.db import transaction
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_safe
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.conf import settings
+from PIL import UnidentifiedImageError
 
-from .models import Post, Category, Comment
+from .models import Post, Comment
 from .forms import PostForm, CommentForm, ProfileEditForm
-from .mixins import CommentSecurityMixin
+from .fragments import render_post_cards
+from .image_tasks import schedule_og_image
+from .images import FORMATS, negotiate_format
+from .mixins import (
+    AnonymousPageCacheMixin, CommentSecurityMixin, CommentsPageMixin,
+    ConditionalGetMixin, KeysetPaginationMixin, PostAuthorMixin,
+    PostCardsMixin
+)
+from .og import OG_SIZE, og_image_name
+from .page_cache import (
+    SCOPE_INDEX, author_scope, category_scope, conditional_page,
+    get_page_generations, post_scope
+)
+from .paginators import get_page
+from .registry import attach_categories_and_locations, categories
+from .resize import get_resize_cache, resize_to_fit
 
 
-def get_posts_queryset(apply_filters=False, apply_annotations=False):
-    """Позволяет добавлять фильтры публикаций и количество комментариев."""
-    queryset = Post.objects.select_related('category', 'author', 'location')
+POST_CARD_FIELDS = (
+    'title', 'excerpt', 'pub_date', 'image', 'image_meta', 'is_published',
+    'comment_count', 'version', 'category', 'location', 'author__username',
+)
 
-    if apply_filters:
-        queryset = queryset.filter(
-            is_published=True,
-            category__is_published=True,
-            pub_date__lte=timezone.now()
-        ).order_by('-pub_date')
 
-    if apply_annotations:
-        queryset = queryset.annotate(
-            comment_count=Count('comments')
-        ).order_by('-pub_date')
+def get_posts_queryset(apply_filters=False):
+    """Позволяет добавлять фильтры публикаций к общему запросу постов.
+
+    Выбираются только колонки, нужные карточке поста: полный текст
+    в ленты не загружается, а категории и места берутся из реестров.
+    """
+    queryset = Post.objects.select_related('author').only(*POST_CARD_FIELDS)
+
+    if apply_filters:
+        queryset = queryset.filter(is_visible=True).order_by('-pub_date')
 
     return queryset
 
 
-class PostListView(ListView):
+def get_visible_post_or_404(user, queryset, post_id):
+    """Пост, доступный пользователю: видимый читателям или его собственный."""
+    post = get_object_or_404(queryset, pk=post_id)
+    if post.author_id != user.id and not post.is_visible:
+        raise Http404("Пост не найден или недоступен")
+    return post
+
+
+class PostListView(ConditionalGetMixin, AnonymousPageCacheMixin,
+                   PostCardsMixin, KeysetPaginationMixin, ListView):
     """Отображает главную страницу с постами, отсортированными по дате."""
 
     model = Post
     template_name = 'blog/index.html'
     context_object_name = 'page_obj'
     paginate_by = settings.POSTS_PER_PAGE
-    queryset = get_posts_queryset(
-        apply_filters=True,
-        apply_annotations=True
-    )
+    page_cache_scopes = (SCOPE_INDEX,)
 
+    def get_queryset(self):
+        """Собирает запрос ленты заново для каждого запроса."""
+        return get_posts_queryset(apply_filters=True)
 
-class PostDetailView(DetailView):
+
+class PostDetailView(ConditionalGetMixin, AnonymousPageCacheMixin,
+                     CommentsPageMixin, DetailView):
     """Отображает детальную страницу опубликованного поста с указанным id."""
 
     model = Post
     template_name = 'blog/detail.html'
     context_object_name = 'post'
 
+    def get_page_cache_scopes(self):
+        """Страница поста зависит от самого поста и его комментариев."""
+        return (post_scope(self.kwargs['post_id']),)
+
     def get_object(self):
         """Получает объект поста с проверкой прав доступа."""
-        post = get_object_or_404(
-            Post.objects.select_related('author', 'category', 'location'),
-            pk=self.kwargs['post_id']
+        post = get_visible_post_or_404(
+            self.request.user,
+            Post.objects.select_related('author').defer('text'),
+            self.kwargs['post_id']
         )
-        user = self.request.user
+        attach_categories_and_locations([post])
+        return post
 
-        if post.author != user and any([
-            post.is_published is False,
-            post.category.is_published is False,
-            post.pub_date > timezone.now()
-        ]):
-            raise Http404("Пост не найден или недоступен")
+    def get_context_data(self, **kwargs):
+        """Добавляет в контекст комментарии, форму и превью для соцсетей.
+
+        Если превью для текущих полей поста ещё нет, оно ставится
+        в очередь, а страница отдаётся без него.
+        """
+        context = super().get_context_data(**kwargs)
+        context['comments'] = self.get_comments_page()
+        context['form'] = CommentForm()
+        og_image = og_image_name(self.object)
+        if default_storage.exists(og_image):
+            context['og_image'] = self.request.build_absolute_uri(
+                default_storage.url(og_image)
+            )
+            context['og_width'], context['og_height'] = OG_SIZE
+        else:
+            schedule_og_image(self.object.pk)
+        return context
 
-        return post
+
+class PostCommentsView(ConditionalGetMixin, AnonymousPageCacheMixin,
+                       CommentsPageMixin, DetailView):
+    """Отдаёт HTML следующей страницы комментариев поста."""
+
+    template_name = 'includes/comments.html'
+    context_object_name = 'post'
+
+    def get_page_cache_scopes(self):
+        """Комментарии устаревают вместе со страницей поста."""
+        return (post_scope(self.kwargs['post_id']),)
+
+    def get_object(self):
+        """Получает пост с проверкой прав доступа без лишних колонок."""
+        return get_visible_post_or_404(
+            self.request.user,
+            Post.objects.only('author', 'is_visible'),
+            self.kwargs['post_id']
+        )
 
     def get_context_data(self, **kwargs):
-        """Добавляет в контекст комментарии с оптимизацией запроса."""
+        """Страница комментариев по курсору из запроса, без формы."""
         context = super().get_context_data(**kwargs)
-        context['comments'] = (
-            self.object.comments
-            .select_related('author')
-            .order_by('created_at')
+        context['comments'] = self.get_comments_page(
+            self.request.GET.get(self.cursor_kwarg)
         )
-        context['form'] = CommentForm()
+        context['comments_only'] = True
         return context
 
 
-class CategoryPostsView(ListView):
+class CategoryPostsView(ConditionalGetMixin, AnonymousPageCacheMixin,
+                        PostCardsMixin, KeysetPaginationMixin, ListView):
     """Отображает страницу с опубликованными постами указанной категории."""
 
     template_name = 'blog/category.html'
     context_object_name = 'page_obj'
     paginate_by = settings.POSTS_PER_PAGE
 
+    def get_page_cache_scopes(self):
+        """Страница категории зависит от её постов."""
+        return (category_scope(self.kwargs['category_slug']),)
+
     def get_category(self):
-        """Получает объект категории."""
-        return get_object_or_404(
-            Category.objects.filter(is_published=True),
-            slug=self.kwargs['category_slug']
+        """Получает опубликованную категорию из реестра."""
+        category = categories.find(
+            slug=self.kwargs['category_slug'], is_published=True
         )
+        if category is None:
+            raise Http404("Категория не найдена или снята с публикации")
+        return category
 
     def get_queryset(self):
         """Использует универсальную функцию и фильтрует по категории."""
-        return get_posts_queryset(
-            apply_filters=True,
-            apply_annotations=True
-        ).filter(category=self.get_category())
+        return get_posts_queryset(apply_filters=True).filter(
+            category=self.get_category()
+        )
 
     def get_context_data(self, **kwargs):
         """Добавляет категорию в контекст."""
@@ -133,21 +205,12 @@ class PostCreateView(LoginRequiredMixin, CreateView):
         )
 
 
-class PostUpdateView(LoginRequiredMixin, UpdateView):
+class PostUpdateView(PostAuthorMixin, UpdateView):
     """Добавляет возможность редактирования постов."""
 
-    model = Post
-    pk_url_kwarg = 'post_id'
     form_class = PostForm
     template_name = 'blog/create.html'
 
-    def dispatch(self, request, *args, **kwargs):
-        """Проверяет, что пользователь - автор поста."""
-        obj = self.get_object()
-        if obj.author != request.user:
-            return redirect('blog:post_detail', post_id=self.kwargs['post_id'])
-        return super().dispatch(request, *args, **kwargs)
-
     def get_success_url(self):
         """URL для перенаправления после успешного редактирования."""
         return reverse_lazy(
@@ -156,21 +219,12 @@ class PostUpdateView(LoginRequiredMixin, UpdateView):
         )
 
 
-class PostDeleteView(LoginRequiredMixin, DeleteView):
+class PostDeleteView(PostAuthorMixin, DeleteView):
     """Добавляет возможность удаления поста с подтверждением."""
 
-    model = Post
-    pk_url_kwarg = 'post_id'
     template_name = 'blog/detail.html'
     success_url = reverse_lazy('blog:index')
 
-    def dispatch(self, request, *args, **kwargs):
-        """Проверяет, что пользователь - автор поста."""
-        obj = self.get_object()
-        if obj.author != request.user:
-            return redirect('blog:post_detail', post_id=self.kwargs['post_id'])
-        return super().dispatch(request, *args, **kwargs)
-
     def get_context_data(self, **kwargs):
         """Добавляет комментарии в контекст."""
         context = super().get_context_data(**kwargs)
@@ -185,8 +239,9 @@ class CommentCreateView(LoginRequiredMixin, CreateView):
     form_class = CommentForm
     template_name = 'blog/detail.html'
 
+    @transaction.atomic
     def form_valid(self, form):
-        """Обработка валидной формы комментария."""
+        """Сохраняет комментарий вместе с обновлением счётчика поста."""
         form.instance.author = self.request.user
         form.instance.post = get_object_or_404(Post, pk=self.kwargs['post_id'])
         return super().form_valid(form)
@@ -212,16 +267,25 @@ class CommentDeleteView(CommentSecurityMixin, DeleteView):
 
 
 def profile_view(request, username):
-    """Отображает страницу профиля пользователя."""
-    template = 'blog/profile.html'
+    """Отображает страницу профиля пользователя.
+
+    Если посты автора не менялись, отвечает 304 без рендеринга страницы.
+    """
     profile = get_object_or_404(User, username=username)
+    generations = get_page_generations((author_scope(profile.pk),))
+    return conditional_page(request, generations)(render_profile)(
+        request, profile
+    )
+
+
+def render_profile(request, profile):
+    """Рендерит страницу профиля с постами автора."""
+    template = 'blog/profile.html'
     post_list = get_posts_queryset(
-        apply_filters=(request.user != profile),
-        apply_annotations=True
+        apply_filters=(request.user != profile)
     ).filter(author=profile)
-    paginator = Paginator(post_list, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = get_page(request, post_list, settings.POSTS_PER_PAGE)
+    render_post_cards(page_obj)
     context = {'profile': profile, 'page_obj': page_obj}
     return render(request, template, context)
 
@@ -239,3 +303,38 @@ def edit_profile(request):
 
     context = {'form': form, 'profile': user_edit}
     return render(request, template, context)
+
+
+@require_safe
+def resize_image(request, width, height, path):
+    """Отдаёт изображение поста, вписанное в рамку width x height.
+
+    Допустимы только рамки из IMAGE_RESIZE_SIZES. Копия строится при
+    первом запросе и дальше берётся из дискового кэша.
+    Формат выбирается по заголовку Accept, JPEG отдаётся по умолчанию.
+    """
+    if (
+        not path.startswith(settings.POST_IMAGE_UPLOAD_DIR)
+        or (width, height) not in settings.IMAGE_RESIZE_SIZES
+    ):
+        raise Http404('Недопустимый размер или файл')
+    try:
+        modified = default_storage.get_modified_time(path)
+    except (FileNotFoundError, SuspiciousFileOperation):
+        raise Http404('Изображение не найдено')
+    fmt = negotiate_format(request.headers.get('Accept', ''))
+    key = hashlib.sha256(
+        f'{path}:{modified.timestamp()}:{width}x{height}:{fmt}'.encode()
+    ).hexdigest()
+    try:
+        cached = get_resize_cache().open_or_create(
+            key, lambda: resize_to_fit(path, width, height, fmt)
+        )
+    except (IsADirectoryError, UnidentifiedImageError):
+        raise Http404('Изображение не найдено')
+    response = FileResponse(cached, content_type=FORMATS[fmt].mime_type)
+    response['Cache-Control'] = (
+        f'public, max-age={settings.IMAGE_RESIZE_MAX_AGE}'
+    )
+    patch_vary_headers(response, ('Accept',))
+    return response
@@ -5,3 +5,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogicum.settings')
 
 application = get_asgi_application()
+
+from blog.scheduler import start_scheduler  # noqa: E402
+
+start_scheduler()
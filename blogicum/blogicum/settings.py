@@ -27,11 +27,11 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
+    'core.apps.CoreConfig',
     'django.contrib.staticfiles',
     'django_bootstrap5',
     'pages.apps.PagesConfig',
     'blog.apps.BlogConfig',
-    'core.apps.CoreConfig',
     'user.apps.UserConfig'
 ]
 
@@ -75,6 +75,25 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Транзакция сразу берёт блокировку записи и ждёт её по
+            # busy_timeout, а не падает при попытке повысить блокировку.
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+# Кэш общий для всех процессов веб-сервера: поколения страниц, сами
+# страницы и фрагменты должны сбрасываться сразу во всех процессах.
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.SharedFileCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {'MAX_ENTRIES': 20000, 'CULL_EVERY': 100},
     }
 }
 
@@ -134,6 +153,19 @@ MEDIA_URL = '/media/'
 
 MEDIA_ROOT = BASE_DIR / 'media'
 
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+    'post_images': {
+        'BACKEND': 'core.storage.ContentAddressedStorage',
+        'OPTIONS': {'shard_depth': 2},
+    },
+}
+
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
@@ -141,3 +173,68 @@ EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 CSRF_FAILURE_VIEW = 'pages.views.csrf_failure'
 
 POSTS_PER_PAGE = 10
+
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+PAGE_CACHE_TIMEOUT = 60
+
+PAGE_GENERATION_TIMEOUT = 60 * 60 * 24
+
+PAGINATOR_COUNT_TIMEOUT = 60 * 5
+
+FEED_TIME_BUCKET = 30
+
+COMMENTS_PER_PAGE = 20
+
+REGISTRY_CHECK_INTERVAL = 5
+
+POST_IMAGE_VARIANTS = {'card': 640, 'detail': 960, 'retina': 1920}
+
+POST_IMAGE_FORMATS = ('avif', 'webp', 'jpeg')
+
+POST_IMAGE_QUALITY = {'avif': 55, 'webp': 78, 'jpeg': 82}
+
+POST_IMAGE_PLACEHOLDER_SIZE = 16
+
+OG_IMAGE_FONT = 'DejaVuSans.ttf'
+
+IMAGE_WORKERS = 2
+
+POST_IMAGE_UPLOAD_DIR = 'posts_images/'
+
+POST_IMAGE_RELEASE_GRACE = 60 * 10
+
+POST_IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+
+FILE_UPLOAD_HANDLERS = ['blog.uploads.ImageUploadHandler']
+
+MEDIA_MAX_AGE = 60 * 60
+
+# None, 'x-accel-redirect' (nginx) или 'x-sendfile' (Apache, lighttpd).
+MEDIA_OFFLOAD = None
+
+MEDIA_ACCEL_REDIRECT_LOCATION = '/protected-media/'
+
+IMAGE_RESIZE_CACHE_DIR = BASE_DIR / 'resize_cache'
+
+IMAGE_RESIZE_CACHE_BYTES = 512 * 1024 * 1024
+
+# Рамки (ширина, высота), которые можно запросить у /media/resize/;
+# нулевая высота ограничивает только ширину.
+IMAGE_RESIZE_SIZES = {
+    (width, 0) for width in POST_IMAGE_VARIANTS.values()
+}
+
+IMAGE_RESIZE_MAX_AGE = 60 * 60 * 24
+
+IMAGE_RESIZE_WAIT_TIMEOUT = 30
+
+# Применяются к каждому новому соединению SQLite (core.signals).
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'memory',
+}
@@ -1,8 +1,8 @@
 from django.contrib import admin
 from django.urls import include, path
 from django.conf import settings
-from django.conf.urls.static import static
 
+from core.views import serve_media
 from user.views import register
 
 
@@ -12,7 +12,12 @@ urlpatterns = [
     path('auth/registration/', register, name='registration'),
     path('', include('blog.urls', namespace='blog')),
     path('pages/', include('pages.urls', namespace='pages')),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path(
+        settings.MEDIA_URL.lstrip('/') + '<path:path>',
+        serve_media,
+        name='media'
+    ),
+]
 
 handler404 = 'pages.views.page_not_found'
 handler500 = 'pages.views.server_error'
@@ -0,0 +1,28 @@
+import threading
+
+from django.core.cache.backends.filebased import FileBasedCache
+
+
+class SharedFileCache(FileBasedCache):
+    """Файловый кэш, общий для всех процессов на одной машине.
+
+    FileBasedCache перечисляет весь каталог кэша при каждой записи, чтобы
+    решить, пора ли освобождать место. На десятках тысяч записей это
+    дороже самой записи, поэтому проверка выполняется раз в CULL_EVERY
+    записей процесса: кэш может ненадолго превысить MAX_ENTRIES не
+    больше чем на CULL_EVERY записей от каждого процесса.
+    """
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._cull_every = params.get('OPTIONS', {}).get('CULL_EVERY', 100)
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+
+    def _cull(self):
+        with self._writes_lock:
+            self._writes += 1
+            if self._writes < self._cull_every:
+                return
+            self._writes = 0
+        super()._cull()
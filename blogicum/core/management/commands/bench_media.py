@@ -0,0 +1,131 @@
+import http.client
+import os
+import shutil
+import socketserver
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.servers.basehttp import (
+    WSGIRequestHandler, WSGIServer, get_internal_wsgi_application
+)
+from django.test.utils import override_settings
+from django.urls import path
+from django.views.static import serve
+
+from core.servers import SendfileRequestHandler, SendfileWSGIServer
+from core.views import serve_media
+
+
+def serve_static(request, path):
+    """Раздача через django.views.static.serve, как в static()."""
+    return serve(request, path, document_root=settings.MEDIA_ROOT)
+
+
+# URLconf замеров: тот же файл через static() и через serve_media.
+urlpatterns = [
+    path('static/<path:path>', serve_static),
+    path('media/<path:path>', serve_media),
+]
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class QuietSendfileRequestHandler(SendfileRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class QuietSendfileServer(SendfileWSGIServer):
+    request_handler_class = QuietSendfileRequestHandler
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность раздачи медиафайлов через '
+        'static() и через serve_media с чтением в Python и с os.sendfile.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', type=int, default=64, help='Размер файла в МиБ.'
+        )
+        parser.add_argument('--requests', type=int, default=20)
+        parser.add_argument('--concurrency', type=int, default=4)
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(media_root, 'bench.bin'), 'wb') as file:
+                for _ in range(options['size']):
+                    file.write(os.urandom(1024 * 1024))
+            with override_settings(
+                MEDIA_ROOT=media_root,
+                MEDIA_OFFLOAD=None,
+                ROOT_URLCONF=__name__,
+                ALLOWED_HOSTS=['*'],
+                DEBUG=False,
+            ):
+                for title, server_cls, url in (
+                    ('static()', WSGIServer, '/static/bench.bin'),
+                    ('serve_media', WSGIServer, '/media/bench.bin'),
+                    ('serve_media + sendfile', QuietSendfileServer,
+                     '/media/bench.bin'),
+                ):
+                    self.report(title, self.measure(server_cls, url, options))
+        finally:
+            shutil.rmtree(media_root)
+
+    def measure(self, server_cls, url, options):
+        """Скачивает файл несколько раз параллельно; байты и секунды."""
+        server = type(
+            'BenchServer', (socketserver.ThreadingMixIn, server_cls), {}
+        )(('127.0.0.1', 0), QuietRequestHandler)
+        server.daemon_threads = True
+        server.set_app(get_internal_wsgi_application())
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        port = server.server_address[1]
+        received = []
+        lock = threading.Lock()
+
+        def download(count):
+            for _ in range(count):
+                connection = http.client.HTTPConnection('127.0.0.1', port)
+                connection.request('GET', url)
+                response = connection.getresponse()
+                size = 0
+                while chunk := response.read(1024 * 1024):
+                    size += len(chunk)
+                connection.close()
+                with lock:
+                    received.append(size)
+
+        workers = [
+            threading.Thread(
+                target=download,
+                args=(options['requests'] // options['concurrency'],)
+            )
+            for _ in range(options['concurrency'])
+        ]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        server.shutdown()
+        server.server_close()
+        return sum(received), len(received), elapsed
+
+    def report(self, title, measurement):
+        total, count, elapsed = measurement
+        self.stdout.write(
+            f'{title:24} {count} запросов, '
+            f'{total / 1024 / 1024 / elapsed:8.1f} МиБ/с'
+        )
@@ -0,0 +1,159 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.sqlite import apply_pragmas
+
+
+# (название, PRAGMA, начало транзакции записи). Без PRAGMA — как у
+# Django по умолчанию: журнал отката и ожидание блокировки до 5 секунд.
+CONFIGURATIONS = (
+    ('по умолчанию', {'busy_timeout': 5000}, 'BEGIN'),
+    ('SQLITE_PRAGMAS', None, 'BEGIN'),
+    ('SQLITE_PRAGMAS + IMMEDIATE', None, 'BEGIN IMMEDIATE'),
+)
+
+
+def is_locked(error):
+    return 'locked' in str(error) or 'busy' in str(error)
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает временную базу SQLite параллельными читателями и '
+        'писателями и сравнивает пропускную способность и ошибки '
+        'блокировок при разных настройках соединения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=5,
+            help='Длительность замера каждой настройки в секундах.'
+        )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=20000,
+            help='Количество строк в таблице перед замером.'
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        for title, pragmas, begin in CONFIGURATIONS:
+            if pragmas is None:
+                pragmas = settings.SQLITE_PRAGMAS
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                self.populate(path)
+                self.report(title, self.measure(path, pragmas, begin))
+
+    def connect(self, path, pragmas):
+        connection = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False
+        )
+        apply_pragmas(connection.cursor(), pragmas)
+        return connection
+
+    def populate(self, path):
+        """Таблица постов, похожая на blog_post по размеру строк."""
+        connection = sqlite3.connect(path, isolation_level=None)
+        connection.execute(
+            'CREATE TABLE post (id INTEGER PRIMARY KEY, title TEXT, '
+            'text TEXT, comment_count INTEGER, pub_date REAL)'
+        )
+        connection.execute(
+            'CREATE INDEX post_pub_date_idx ON post (pub_date)'
+        )
+        connection.execute('BEGIN')
+        connection.executemany(
+            'INSERT INTO post (title, text, comment_count, pub_date) '
+            'VALUES (?, ?, 0, ?)',
+            (
+                (f'Пост {number}', 'текст ' * 200, time.time() - number)
+                for number in range(self.options['rows'])
+            )
+        )
+        connection.execute('COMMIT')
+        connection.close()
+
+    def read(self, connection):
+        """Страница ленты и один пост, как на главной и в посте."""
+        offset = random.randrange(self.options['rows'] // 10)
+        connection.execute(
+            'SELECT id, title, pub_date FROM post '
+            'ORDER BY pub_date DESC LIMIT 10 OFFSET ?', (offset,)
+        ).fetchall()
+        connection.execute(
+            'SELECT * FROM post WHERE id = ?',
+            (random.randrange(1, self.options['rows']),)
+        ).fetchone()
+
+    def write(self, connection, begin):
+        """Комментарий: чтение поста и пересчёт счётчика в транзакции."""
+        post_id = random.randrange(1, self.options['rows'])
+        connection.execute(begin)
+        connection.execute(
+            'SELECT comment_count FROM post WHERE id = ?', (post_id,)
+        ).fetchone()
+        connection.execute(
+            'UPDATE post SET comment_count = comment_count + 1 '
+            'WHERE id = ?', (post_id,)
+        )
+        connection.execute('COMMIT')
+
+    def measure(self, path, pragmas, begin):
+        """Операции и ошибки блокировок читателей и писателей за замер."""
+        # Первое соединение переключает журнал до старта потоков.
+        self.connect(path, pragmas).close()
+        totals = {'reads': 0, 'writes': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + self.options['duration']
+
+        def run(key, operation, *args):
+            connection = self.connect(path, pragmas)
+            done = errors = 0
+            while time.perf_counter() < deadline:
+                try:
+                    operation(connection, *args)
+                    done += 1
+                except sqlite3.OperationalError as error:
+                    if not is_locked(error):
+                        raise
+                    errors += 1
+                    if connection.in_transaction:
+                        connection.execute('ROLLBACK')
+            connection.close()
+            with lock:
+                totals[key] += done
+                totals['errors'] += errors
+
+        threads = [
+            threading.Thread(target=run, args=('reads', self.read))
+            for _ in range(self.options['readers'])
+        ] + [
+            threading.Thread(target=run, args=('writes', self.write, begin))
+            for _ in range(self.options['writers'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return totals
+
+    def report(self, title, totals):
+        duration = self.options['duration']
+        self.stdout.write(
+            f'{title:28} чтений/с: {totals["reads"] / duration:9.1f}  '
+            f'записей/с: {totals["writes"] / duration:8.1f}  '
+            f'ошибок блокировки: {totals["errors"]}'
+        )
@@ -0,0 +1,13 @@
+from django.contrib.staticfiles.management.commands.runserver import (
+    Command as RunserverCommand
+)
+
+from core.servers import SendfileWSGIServer
+
+
+class Command(RunserverCommand):
+    help = (
+        'Запускает сервер разработки, который отдаёт файлы ответов '
+        'через os.sendfile.'
+    )
+    server_cls = SendfileWSGIServer
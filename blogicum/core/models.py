@@ -1,6 +1,13 @@
+import time
+
 from django.db import models
 
 
+def new_version():
+    """Возвращает новый токен версии записи для ключей кэша."""
+    return time.time_ns()
+
+
 class PublishedModel(models.Model):
     """Абстрактная модель. Добвляет флаг публикации и дату создания."""
 
@@ -13,6 +20,38 @@ class PublishedModel(models.Model):
         auto_now_add=True,
         verbose_name='Добавлено'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Изменено'
+    )
 
     class Meta:
         abstract = True
+
+    def save(self, *args, **kwargs):
+        """Обновляет время изменения и при сохранении отдельных полей."""
+        update_fields = kwargs.get('update_fields')
+        if update_fields:
+            kwargs['update_fields'] = {*update_fields, 'updated_at'}
+        super().save(*args, **kwargs)
+
+
+class VersionedModel(models.Model):
+    """Абстрактная модель. Добавляет версию, меняющуюся при сохранении."""
+
+    version = models.PositiveBigIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Версия'
+    )
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        """Выдаёт записи новую версию при каждом сохранении."""
+        self.version = new_version()
+        update_fields = kwargs.get('update_fields')
+        if update_fields:
+            kwargs['update_fields'] = {*update_fields, 'version'}
+        super().save(*args, **kwargs)
@@ -0,0 +1,78 @@
+import io
+import os
+import select
+
+from django.core.servers.basehttp import (
+    ServerHandler, WSGIRequestHandler, WSGIServer
+)
+
+
+SENDFILE_CHUNK = 8 * 1024 * 1024
+
+
+class SendfileServerHandler(ServerHandler):
+    """Обработчик сервера разработки, отдающий файлы через os.sendfile.
+
+    Данные копируются из файла в сокет ядром, минуя Python. Смещение
+    берётся из дескриптора файла, длина — из Content-Length ответа.
+    """
+
+    def sendfile(self):
+        try:
+            source = self.result.filelike.fileno()
+            target = self.request_handler.connection.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            return False
+        offset = os.lseek(source, 0, os.SEEK_CUR)
+        length = self.headers.get('Content-Length')
+        remaining = (
+            int(length) if length is not None
+            else os.fstat(source).st_size - offset
+        )
+        if not self.headers_sent:
+            self.send_headers()
+        self._flush()
+        while remaining > 0:
+            try:
+                sent = os.sendfile(
+                    target, source, offset, min(remaining, SENDFILE_CHUNK)
+                )
+            except BlockingIOError:
+                select.select([], [target], [])
+                continue
+            if not sent:
+                break
+            offset += sent
+            remaining -= sent
+            self.bytes_sent += sent
+        return True
+
+
+class SendfileRequestHandler(WSGIRequestHandler):
+    def handle_one_request(self):
+        """Копия метода WSGIRequestHandler со своим обработчиком."""
+        self.raw_requestline = self.rfile.readline(65537)
+        if len(self.raw_requestline) > 65536:
+            self.requestline = ''
+            self.request_version = ''
+            self.command = ''
+            self.send_error(414)
+            return
+        if not self.parse_request():
+            return
+        handler = SendfileServerHandler(
+            self.rfile, self.wfile, self.get_stderr(), self.get_environ()
+        )
+        handler.request_handler = self
+        handler.run(self.server.get_app())
+
+
+class SendfileWSGIServer(WSGIServer):
+    """Сервер разработки, обрабатывающий запросы SendfileRequestHandler."""
+
+    request_handler_class = SendfileRequestHandler
+
+    def __init__(self, server_address, handler_class, *args, **kwargs):
+        super().__init__(
+            server_address, self.request_handler_class, *args, **kwargs
+        )
@@ -0,0 +1,37 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def apply_pragmas(cursor, pragmas):
+    """Выполняет PRAGMA из словаря «имя: значение» на соединении SQLite."""
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@contextmanager
+def database_copy(directory, alias=DEFAULT_DB_ALIAS):
+    """Временно подменяет базу SQLite её копией в каталоге directory.
+
+    Копия снимается через backup API, которому хватает блокировки
+    чтения, поэтому рабочие процессы продолжают писать в базу, а всё,
+    что записано в копию, исчезает вместе с каталогом.
+    """
+    connection = connections[alias]
+    source = connection.settings_dict['NAME']
+    path = os.path.join(directory, 'copy.sqlite3')
+    connection.ensure_connection()
+    target = sqlite3.connect(path)
+    try:
+        connection.connection.backup(target)
+    finally:
+        target.close()
+    connection.close()
+    connection.settings_dict['NAME'] = path
+    try:
+        yield path
+    finally:
+        connection.close()
+        connection.settings_dict['NAME'] = source
@@ -0,0 +1,98 @@
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+HEX_DIGITS = set('0123456789abcdef')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, в котором имя файла — хэш SHA-256 его содержимого.
+
+    Одинаковые загрузки хранятся в одном экземпляре, а имя файла никогда
+    не меняет содержимого, поэтому его URL можно кэшировать навсегда.
+    Из исходного имени сохраняются только каталог и расширение.
+
+    Файлы раскладываются по shard_depth уровням подкаталогов из пар
+    первых символов хэша, чтобы в одном каталоге не копились миллионы
+    файлов: posts_images/ab/cd/abcd….jpg.
+    """
+
+    def __init__(self, *args, shard_depth=0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shard_depth = shard_depth
+
+    def hashed_name(self, name, content):
+        """Имя файла по хэшу содержимого в каталоге исходного имени."""
+        hasher = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            hasher.update(chunk)
+        content.seek(0)
+        digest = hasher.hexdigest()
+        directory, filename = posixpath.split(name)
+        extension = posixpath.splitext(filename)[1].lower()
+        return posixpath.join(
+            directory, *self._shards(digest), digest + extension
+        )
+
+    def is_hashed(self, name):
+        """Лежит ли файл там, куда его положило бы это хранилище."""
+        *directories, filename = name.split('/')
+        digest = posixpath.splitext(filename)[0]
+        return (
+            len(digest) == 64
+            and set(digest) <= HEX_DIGITS
+            and len(directories) >= self.shard_depth
+            and directories[len(directories) - self.shard_depth:]
+            == self._shards(digest)
+        )
+
+    def _shards(self, digest):
+        return [digest[i:i + 2] for i in range(0, self.shard_depth * 2, 2)]
+
+    def save(self, name, content, max_length=None):
+        """Сохраняет содержимое, если такого файла ещё нет.
+
+        У существующей копии обновляется время изменения: по нему
+        освобождение файла отличает только что загруженные дубликаты.
+        """
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            name = self._save(name, content)
+        return name.replace('\\', '/')
+
+    def _save(self, name, content):
+        """Записывает файл через временный и атомарно переименовывает.
+
+        Одновременные загрузки одного содержимого пишут одинаковые байты,
+        поэтому выигрывает любая из них.
+        """
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                for chunk in content.chunks():
+                    file.write(chunk)
+            os.chmod(temporary, self.file_permissions_mode or 0o644)
+            os.replace(temporary, full_path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        return name
+
+    def get_available_name(self, name, max_length=None):
+        """Имя не меняется: файл с таким именем хранит то же содержимое."""
+        return name
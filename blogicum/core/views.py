@@ -0,0 +1,177 @@
+import mimetypes
+import os
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import storages
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from .storage import ContentAddressedStorage
+
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+
+class FileRange:
+    """Часть открытого файла для FileResponse.
+
+    Чтение ограничено длиной части, а fileno() позволяет серверу отдать
+    её через os.sendfile: смещение уже выставлено в дескрипторе файла,
+    длина — в заголовке Content-Length.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Начало и длина единственного диапазона из заголовка Range.
+
+    None означает, что заголовок не поддерживается (например, несколько
+    диапазонов) и файл отдаётся целиком; ValueError — что диапазон
+    лежит за концом файла.
+    """
+    unit, _, spec = header.partition('=')
+    first, dash, last = spec.strip().partition('-')
+    if (
+        unit.strip().lower() != 'bytes'
+        or not dash
+        or not (first or last)
+        or not all(part.isdigit() for part in (first, last) if part)
+    ):
+        return None
+    if not first:
+        length = min(int(last), size)
+        if not length:
+            raise ValueError(header)
+        return size - length, length
+    start = int(first)
+    if start >= size:
+        raise ValueError(header)
+    end = min(int(last), size - 1) if last else size - 1
+    if end < start:
+        return None
+    return start, end - start + 1
+
+
+def is_immutable(path):
+    """Назван ли файл по хэшу содержимого, то есть неизменен ли он."""
+    return any(
+        isinstance(storages[alias], ContentAddressedStorage)
+        and storages[alias].is_hashed(path)
+        for alias in settings.STORAGES
+    )
+
+
+def guess_content_type(full_path):
+    return mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+
+def offload_response(path, full_path):
+    """Пустой ответ, который передаёт отдачу файла фронтенд-серверу.
+
+    Диапазоны байтов фронтенд-сервер обрабатывает сам.
+    """
+    response = HttpResponse(content_type=guess_content_type(full_path))
+    if settings.MEDIA_OFFLOAD == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_REDIRECT_LOCATION + quote(path)
+        )
+    else:
+        response['X-Sendfile'] = full_path
+    return response
+
+
+def file_response(request, full_path, size, etag, last_modified):
+    """Ответ с файлом целиком или запрошенным диапазоном байтов."""
+    content_type = guess_content_type(full_path)
+    start, length, status = 0, size, 200
+    if_range = request.headers.get('If-Range')
+    if 'Range' in request.headers and (
+        if_range is None or if_range in (etag, http_date(last_modified))
+    ):
+        try:
+            requested = parse_range(request.headers['Range'], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+        if requested is not None:
+            start, length = requested
+            status = 206
+    if request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type, status=status)
+    else:
+        response = FileResponse(
+            FileRange(open(full_path, 'rb'), start, length),
+            content_type=content_type,
+            status=status
+        )
+    response['Content-Length'] = length
+    if status == 206:
+        response['Content-Range'] = (
+            f'bytes {start}-{start + length - 1}/{size}'
+        )
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """Отдаёт загруженный файл из MEDIA_ROOT.
+
+    Поддерживает условные запросы по ETag и дате изменения и запросы
+    диапазонов байтов. Если настроен MEDIA_OFFLOAD, сам файл отдаёт
+    фронтенд-сервер по заголовку X-Accel-Redirect или X-Sendfile.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        info = os.stat(full_path)
+    except (SuspiciousFileOperation, FileNotFoundError, NotADirectoryError):
+        raise Http404('Файл не найден')
+    if not stat.S_ISREG(info.st_mode):
+        raise Http404('Файл не найден')
+    etag = f'"{info.st_mtime_ns:x}-{info.st_size:x}"'
+    last_modified = int(info.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        if settings.MEDIA_OFFLOAD:
+            response = offload_response(path, full_path)
+        else:
+            response = file_response(
+                request, full_path, info.st_size, etag, last_modified
+            )
+    if is_immutable(path):
+        response['Cache-Control'] = (
+            f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+        )
+    else:
+        response['Cache-Control'] = (
+            f'public, max-age={settings.MEDIA_MAX_AGE}'
+        )
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    return response
@@ -19,6 +19,7 @@ from typing import (
 import pytest
 from django.apps import apps
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.db.models import Model, Field
 from django.forms import BaseForm
 from django.http import HttpResponse
@@ -41,6 +42,27 @@ def enable_debug_false():
         yield
 
 
+@pytest.fixture(autouse=True)
+def isolate_media(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path / "media"
+    settings.IMAGE_RESIZE_CACHE_DIR = tmp_path / "resize_cache"
+    settings.IMAGE_WORKERS = 0
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(settings, tmp_path):
+    from blog.registry import REGISTRIES
+
+    settings.CACHES = {
+        alias: {**config, "LOCATION": tmp_path / f"cache-{alias}"}
+        for alias, config in settings.CACHES.items()
+    }
+    cache.clear()
+    for registry in REGISTRIES.values():
+        registry.clear()
+    yield
+
+
 class SafeImportFromContextManager:
     def __init__(
             self,
@@ -0,0 +1,51 @@
+import pytest
+from django.core.management import call_command
+
+
+@pytest.mark.django_db
+def test_comment_count_follows_comments(mixer, post_with_published_location):
+    post = post_with_published_location
+    comments = mixer.cycle(3).blend("blog.Comment", post=post)
+    post.refresh_from_db()
+    assert post.comment_count == 3, (
+        "Убедитесь, что счётчик комментариев поста растёт при добавлении"
+        " комментариев."
+    )
+
+    comments[0].delete()
+    type(comments[0]).objects.filter(pk=comments[1].pk).delete()
+    post.refresh_from_db()
+    assert post.comment_count == 1, (
+        "Убедитесь, что счётчик комментариев поста уменьшается при удалении"
+        " комментариев, в том числе массовом."
+    )
+
+    post.title = "Новый заголовок"
+    post.comment_count = 100
+    post.save()
+    post.refresh_from_db()
+    assert post.comment_count == 1, (
+        "Убедитесь, что сохранение поста не затирает счётчик комментариев."
+    )
+
+
+@pytest.mark.django_db
+def test_recount_comments_fixes_drift(
+    mixer, user_client, post_with_published_location
+):
+    post = post_with_published_location
+    mixer.cycle(2).blend("blog.Comment", post=post)
+    type(post).objects.filter(pk=post.pk).update(comment_count=7)
+    assert "Комментарии (7)" in user_client.get("/").content.decode("utf-8")
+    call_command("recount_comments")
+    post.refresh_from_db()
+    assert post.comment_count == 2, (
+        "Убедитесь, что команда `recount_comments` исправляет расхождения"
+        " счётчика комментариев."
+    )
+    assert "Комментарии (2)" in user_client.get("/").content.decode(
+        "utf-8"
+    ), (
+        "Убедитесь, что после `recount_comments` карточка поста показывает"
+        " исправленный счётчик."
+    )
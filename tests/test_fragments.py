@@ -0,0 +1,108 @@
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+
+@pytest.mark.django_db
+def test_post_card_cache_invalidation(client, post_with_published_location):
+    post = post_with_published_location
+    assert post.title in client.get("/").content.decode("utf-8")
+
+    for obj, field, value in (
+        (post, "title", "Новый заголовок поста"),
+        (post.category, "title", "Новое имя категории"),
+        (post.location, "name", "Новое место"),
+        (post.author, "username", "renamed_author"),
+    ):
+        setattr(obj, field, value)
+        obj.save()
+        assert value in client.get("/").content.decode("utf-8"), (
+            "Убедитесь, что закэшированная карточка поста обновляется после"
+            f" изменения поля `{field}` у `{type(obj).__name__}`."
+        )
+
+
+@pytest.mark.django_db
+def test_comment_cache_invalidation(client, comment_to_a_post):
+    url = f"/posts/{comment_to_a_post.post_id}/"
+    first_line = comment_to_a_post.text.splitlines()[0]
+    assert first_line in client.get(url).content.decode("utf-8")
+    comment_to_a_post.text = "Исправленный комментарий"
+    comment_to_a_post.save()
+    assert "Исправленный комментарий" in client.get(url).content.decode(
+        "utf-8"
+    ), "Убедитесь, что кэш комментария сбрасывается после его изменения."
+
+
+@pytest.mark.django_db
+def test_feed_uses_stored_excerpt(
+    client, django_assert_num_queries, many_posts_with_published_locations
+):
+    post = many_posts_with_published_locations[-1]
+    post.text = "Первое второе третье " + "слово " * 20
+    post.pub_date = timezone.now()
+    post.save()
+    assert post.excerpt.startswith("Первое второе третье")
+    assert post.excerpt.endswith("…")
+
+    client.get("/?page=1")
+    with django_assert_num_queries(1):
+        response = client.get("/")
+    assert post.excerpt in response.content.decode("utf-8"), (
+        "Убедитесь, что карточка поста показывает сохранённое начало текста."
+    )
+    feed_post = response.context["page_obj"][0]
+    assert "text" in feed_post.get_deferred_fields(), (
+        "Убедитесь, что лента не загружает полный текст постов."
+    )
+
+
+@pytest.mark.django_db
+def test_fill_excerpts_refreshes_feed(client, post_with_published_location):
+    post = post_with_published_location
+    type(post).objects.filter(pk=post.pk).update(excerpt="Устаревшее начало")
+    assert "Устаревшее начало" in client.get("/").content.decode("utf-8")
+    call_command("fill_excerpts")
+    assert "Устаревшее начало" not in client.get("/").content.decode(
+        "utf-8"
+    ), (
+        "Убедитесь, что после `fill_excerpts` лента показывает пересчитанное"
+        " начало текста."
+    )
+
+
+@pytest.mark.django_db
+def test_detail_uses_stored_text_html(
+    user_client, post_with_published_location
+):
+    post = post_with_published_location
+    post.text = "Первая <b>строка</b>\nВторая строка"
+    post.save()
+    assert post.text_html == (
+        "Первая &lt;b&gt;строка&lt;/b&gt;<br>Вторая строка"
+    )
+
+    response = user_client.get(f"/posts/{post.id}/")
+    assert post.text_html in response.content.decode("utf-8"), (
+        "Убедитесь, что страница поста выводит сохранённый HTML текста."
+    )
+    assert "text" in response.context["post"].get_deferred_fields(), (
+        "Убедитесь, что страница поста не загружает исходный текст."
+    )
+
+
+@pytest.mark.django_db
+def test_render_post_texts_refreshes_detail(
+    client, post_with_published_location
+):
+    post = post_with_published_location
+    url = f"/posts/{post.id}/"
+    type(post).objects.filter(pk=post.pk).update(text_html="Устаревший HTML")
+    assert "Устаревший HTML" in client.get(url).content.decode("utf-8")
+    call_command("render_post_texts")
+    assert "Устаревший HTML" not in client.get(url).content.decode(
+        "utf-8"
+    ), (
+        "Убедитесь, что после `render_post_texts` страница поста показывает"
+        " перерисованный текст."
+    )
@@ -0,0 +1,469 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from PIL import ExifTags, Image
+
+from blog.models import Post
+
+
+def make_image(
+    size=(2000, 1000), fmt="JPEG", color=(73, 109, 137), name="photo.jpg"
+):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, fmt)
+    return ContentFile(buffer.getvalue(), name=name)
+
+
+@pytest.mark.django_db
+def test_variants_built_after_upload(
+    client, django_capture_on_commit_callbacks, post_with_published_location
+):
+    post = post_with_published_location
+    with django_capture_on_commit_callbacks(execute=True):
+        post.image = make_image()
+        post.save()
+    post.refresh_from_db()
+    variants = post.image_meta["variants"]
+    assert post.image_meta["source"] == post.image.name
+    assert {name: v["width"] for name, v in variants.items()} == {
+        "card": 640, "detail": 960, "retina": 1920
+    }, "Убедитесь, что для изображения создаются варианты нужной ширины."
+    for variant in variants.values():
+        assert default_storage.exists(variant["files"]["jpeg"])
+
+    content = client.get("/").content.decode("utf-8")
+    card_url = default_storage.url(variants["card"]["files"]["jpeg"])
+    assert f'src="{card_url}"' in content, (
+        "Убедитесь, что карточка поста ссылается на уменьшенный вариант"
+        " изображения, а не на оригинал."
+    )
+
+
+@pytest.mark.django_db
+def test_backfill_command(post_with_published_location):
+    post = post_with_published_location
+    assert "source" not in post.image_meta
+    call_command("build_image_variants", workers=2)
+    post.refresh_from_db()
+    assert post.image_meta["source"] == post.image.name, (
+        "Убедитесь, что команда `build_image_variants` создаёт варианты"
+        " для уже загруженных изображений."
+    )
+    # Маленькое изображение не увеличивается.
+    assert post.image_meta["variants"]["retina"]["width"] == 100
+
+
+@pytest.mark.django_db
+def test_resize_endpoint(client, settings, post_with_published_location):
+    settings.IMAGE_RESIZE_SIZES = {(200, 200), (200, 0)}
+    post = post_with_published_location
+    post.image = make_image((800, 400))
+    post.save()
+    url = f"/media/resize/200x200/{post.image.name}"
+    response = client.get(url)
+    assert response.status_code == 200
+    resized = Image.open(BytesIO(b"".join(response.streaming_content)))
+    assert resized.size == (200, 100), (
+        "Убедитесь, что изображение вписывается в запрошенную рамку с"
+        " сохранением пропорций."
+    )
+    assert client.get(
+        f"/media/resize/200x0/{post.image.name}"
+    ).status_code == 200
+    assert client.get("/media/resize/200x200/../secret.jpg").status_code == (
+        404
+    )
+    assert client.get(
+        f"/media/resize/99999x200/{post.image.name}"
+    ).status_code == 404
+    assert client.get(
+        f"/media/resize/201x200/{post.image.name}"
+    ).status_code == 404, (
+        "Убедитесь, что копии строятся только для разрешённых рамок."
+    )
+
+
+@pytest.mark.django_db
+def test_resize_endpoint_rejects_non_images(client, settings):
+    settings.IMAGE_RESIZE_SIZES = {(200, 200)}
+    default_storage.save("posts_images/ab/photo.jpg", make_image())
+    default_storage.save(
+        "posts_images/notes.jpg", ContentFile(b"not an image")
+    )
+    for name in ("posts_images/ab", "posts_images/notes.jpg"):
+        assert client.get(
+            f"/media/resize/200x200/{name}"
+        ).status_code == 404, (
+            "Убедитесь, что для каталога и файла, не являющегося"
+            " изображением, возвращается 404."
+        )
+
+
+@pytest.mark.django_db
+def test_modern_formats(
+    client, settings, django_capture_on_commit_callbacks,
+    post_with_published_location
+):
+    settings.IMAGE_RESIZE_SIZES = {(200, 200)}
+    post = post_with_published_location
+    with django_capture_on_commit_callbacks(execute=True):
+        post.image = make_image()
+        post.save()
+    post.refresh_from_db()
+    card = post.image_meta["variants"]["card"]["files"]
+    assert card["webp"].endswith(".webp"), (
+        "Убедитесь, что варианты изображения кодируются и в WebP."
+    )
+    content = client.get("/").content.decode("utf-8")
+    assert '<source type="image/webp"' in content, (
+        "Убедитесь, что карточка поста предлагает браузеру WebP через"
+        " `<picture>`."
+    )
+    assert f'src="{default_storage.url(card["jpeg"])}"' in content, (
+        "Убедитесь, что JPEG остаётся запасным вариантом."
+    )
+
+    url = f"/media/resize/200x200/{post.image.name}"
+    response = client.get(url, HTTP_ACCEPT="image/webp,image/*")
+    assert response["Content-Type"] == "image/webp"
+    assert "Accept" in response["Vary"]
+    assert Image.open(
+        BytesIO(b"".join(response.streaming_content))
+    ).format == "WEBP"
+    assert client.get(url)["Content-Type"] == "image/jpeg", (
+        "Убедитесь, что без поддержки WebP отдаётся JPEG."
+    )
+
+
+def test_negotiate_format_honours_quality():
+    from blog.images import negotiate_format
+
+    assert negotiate_format("image/webp,image/*") == "webp"
+    assert negotiate_format("image/webp;q=0, image/*") == "jpeg", (
+        "Убедитесь, что формат с весом q=0 в Accept не выбирается."
+    )
+    assert negotiate_format("image/webp;q=0.5, image/jpeg") == "jpeg", (
+        "Убедитесь, что при выборе формата учитываются веса q из Accept."
+    )
+    assert negotiate_format("") == "jpeg"
+
+
+def test_resize_cache_coalesces_and_evicts(tmp_path):
+    from blog.resize import ResizeCache
+
+    cache = ResizeCache(tmp_path, max_bytes=250)
+    calls = []
+
+    def build():
+        calls.append(1)
+        time.sleep(0.2)
+        return b"x" * 100
+
+    def read(key, build):
+        with cache.open_or_create(key, build) as file:
+            return file.read()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        contents = list(pool.map(lambda _: read("a" * 64, build), range(8)))
+    assert len(calls) == 1, (
+        "Убедитесь, что одновременные запросы одной копии строят её один раз."
+    )
+    assert set(contents) == {b"x" * 100}
+
+    read("b" * 64, lambda: b"y" * 100)
+    read("a" * 64, build)
+    read("c" * 64, lambda: b"z" * 100)
+    assert not (tmp_path / "bb" / ("b" * 64)).exists(), (
+        "Убедитесь, что при превышении бюджета вытесняется давно не"
+        " использованная копия."
+    )
+    assert (tmp_path / "aa" / ("a" * 64)).exists()
+    assert len(calls) == 1
+
+
+def test_resize_cache_budget_shared_by_processes(tmp_path):
+    from blog.resize import ResizeCache
+
+    # Два экземпляра на одном каталоге — как кэши двух процессов.
+    first = ResizeCache(tmp_path, max_bytes=250)
+    second = ResizeCache(tmp_path, max_bytes=250)
+    opened = first.open_or_create("a" * 64, lambda: b"x" * 100)
+    for key, cache in (("b" * 64, second), ("c" * 64, first)):
+        cache.open_or_create(key, lambda: b"y" * 100).close()
+    total = sum(path.stat().st_size for path in tmp_path.glob("*/*"))
+    assert total <= 250, (
+        "Убедитесь, что бюджет кэша копий общий для всех процессов."
+    )
+    with opened:
+        assert opened.read() == b"x" * 100, (
+            "Убедитесь, что копия, вытесненная другим процессом, дочитывается"
+            " до конца уже начатого ответа."
+        )
+
+
+def test_resize_cache_tracks_size_without_rescanning(tmp_path):
+    from blog.resize import ResizeCache
+
+    cache = ResizeCache(tmp_path, max_bytes=250)
+    cache.open_or_create("a" * 64, lambda: b"x" * 100).close()
+
+    def scan():
+        raise AssertionError("Каталог сканируется при записи в пределах"
+                             " бюджета.")
+
+    cache._scan = scan
+    cache.open_or_create("b" * 64, lambda: b"y" * 100).close()
+    assert (tmp_path / "size").read_text() == "200", (
+        "Убедитесь, что размер кэша копий учитывается при каждой записи"
+        " без повторного сканирования каталога."
+    )
+
+
+@pytest.mark.django_db
+def test_upload_normalized_and_dimensions_stored(
+    client, post_with_published_location
+):
+    post = post_with_published_location
+    exif = Image.Exif()
+    exif[ExifTags.Base.Orientation] = 6
+    exif[ExifTags.Base.Make] = "Camera"
+    buffer = BytesIO()
+    Image.new("RGB", (300, 200), (73, 109, 137)).save(
+        buffer, "JPEG", exif=exif
+    )
+    post.image = ContentFile(buffer.getvalue(), name="rotated.jpg")
+    post.save()
+    post.refresh_from_db()
+    assert post.image_meta == {"width": 200, "height": 300}, (
+        "Убедитесь, что размеры изображения с учётом поворота по EXIF"
+        " сохраняются при загрузке."
+    )
+    with default_storage.open(post.image.name) as file:
+        stored = Image.open(file)
+        assert stored.size == (200, 300)
+        assert not stored.getexif(), (
+            "Убедитесь, что при загрузке из изображения удаляются"
+            " метаданные EXIF."
+        )
+
+    content = client.get("/").content.decode("utf-8")
+    assert 'width="200" height="300"' in content, (
+        "Убедитесь, что карточка поста выводит размеры изображения."
+    )
+
+
+@pytest.mark.django_db
+def test_fill_image_dimensions(post_with_published_location):
+    post = post_with_published_location
+    Post.objects.filter(pk=post.pk).update(image_meta={})
+    call_command("fill_image_dimensions")
+    post.refresh_from_db()
+    assert post.image_meta == {"width": 100, "height": 100}, (
+        "Убедитесь, что команда `fill_image_dimensions` записывает размеры"
+        " уже загруженных изображений."
+    )
+    call_command("fill_image_dimensions", strip=True)
+    post.refresh_from_db()
+    assert post.image_meta == {"width": 100, "height": 100}
+
+
+@pytest.mark.django_db
+def test_fill_image_dimensions_strips_shared_file_once(
+    monkeypatch, post_with_published_location
+):
+    from blog.management.commands import fill_image_dimensions
+
+    first = post_with_published_location
+    second = Post.objects.get(pk=first.pk)
+    second.pk = None
+    second._state.adding = True
+    second.save()
+    exif = Image.Exif()
+    exif[ExifTags.Base.Make] = "Camera"
+    buffer = BytesIO()
+    Image.new("RGB", (300, 200), (73, 109, 137)).save(
+        buffer, "JPEG", exif=exif
+    )
+    source = default_storage.save(
+        "posts_images/shared.jpg", ContentFile(buffer.getvalue())
+    )
+    Post.objects.update(image=source, image_meta={})
+    calls = []
+    normalize = fill_image_dimensions.normalize_image
+    monkeypatch.setattr(
+        fill_image_dimensions, "normalize_image",
+        lambda file: calls.append(1) or normalize(file)
+    )
+    call_command("fill_image_dimensions", strip=True, batch_size=1)
+    assert len(calls) == 1, (
+        "Убедитесь, что `fill_image_dimensions --strip` очищает общий для"
+        " нескольких постов файл один раз."
+    )
+    names = set(Post.objects.values_list("image", flat=True))
+    assert len(names) == 1 and source not in names
+    for post in Post.objects.all():
+        assert post.image_meta == {"width": 300, "height": 200}
+
+
+@pytest.mark.django_db
+def test_placeholder_built_by_worker(
+    client, django_capture_on_commit_callbacks, post_with_published_location
+):
+    post = post_with_published_location
+    with django_capture_on_commit_callbacks(execute=True):
+        post.image = make_image()
+        post.save()
+    post.refresh_from_db()
+    placeholder = post.image_meta["placeholder"]
+    assert placeholder.startswith("data:image/jpeg;base64,")
+    assert len(placeholder) < 1024, (
+        "Убедитесь, что заглушка изображения занимает меньше килобайта."
+    )
+    content = client.get("/").content.decode("utf-8")
+    assert f"url({placeholder})" in content, (
+        "Убедитесь, что карточка поста выводит заглушку изображения."
+    )
+    assert 'loading="lazy"' in content, (
+        "Убедитесь, что изображения в карточках загружаются лениво."
+    )
+
+
+@pytest.mark.django_db
+def test_content_addressed_storage_and_release(
+    settings, django_capture_on_commit_callbacks, post_with_published_location
+):
+    settings.POST_IMAGE_RELEASE_GRACE = 0
+    first = post_with_published_location
+    second = Post.objects.get(pk=first.pk)
+    second.pk = None
+    second._state.adding = True
+    with django_capture_on_commit_callbacks(execute=True):
+        first.image = make_image(name="a.jpg")
+        first.save()
+        second.image = make_image(name="b.JPG")
+        second.save()
+    assert first.image.name == second.image.name, (
+        "Убедитесь, что одинаковые загрузки хранятся в одном файле."
+    )
+    name = first.image.name
+    digest = name.rsplit("/", 1)[1][:64]
+    assert name == f"posts_images/{digest[:2]}/{digest[2:4]}/{digest}.jpg", (
+        "Убедитесь, что изображения раскладываются по подкаталогам из"
+        " начала хэша содержимого."
+    )
+    first.refresh_from_db()
+    variant = first.image_meta["variants"]["card"]["files"]["jpeg"]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        first.delete()
+    assert default_storage.exists(name), (
+        "Убедитесь, что файл не удаляется, пока на него ссылаются посты."
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        second.image = make_image(color=(0, 0, 0))
+        second.save()
+    assert not default_storage.exists(name), (
+        "Убедитесь, что файл изображения удаляется, когда на него больше"
+        " не ссылается ни один пост."
+    )
+    assert not default_storage.exists(variant)
+
+
+@pytest.mark.django_db
+def test_upload_cutoff(settings, user_client, published_category):
+    settings.POST_IMAGE_MAX_UPLOAD_SIZE = 50_000
+    data = {
+        "title": "Заголовок",
+        "text": "Текст",
+        "pub_date": "2020-01-01",
+        "category": published_category.pk,
+    }
+    not_image = ContentFile(b"<?php echo 1; ?>" * 10, name="photo.jpg")
+    response = user_client.post("/posts/create/", {**data, "image": not_image})
+    assert "image" in response.context["form"].errors, (
+        "Убедитесь, что загрузка файла, не являющегося изображением,"
+        " отклоняется."
+    )
+    large = make_image(size=(1000, 1000), fmt="BMP", name="large.jpg")
+    response = user_client.post("/posts/create/", {**data, "image": large})
+    assert "image" in response.context["form"].errors, (
+        "Убедитесь, что слишком большой файл отклоняется."
+    )
+    assert not Post.objects.exists()
+
+    response = user_client.post(
+        "/posts/create/", {**data, "image": make_image(size=(300, 200))}
+    )
+    assert response.status_code == 302
+    assert Post.objects.get().image_meta["width"] == 300
+
+
+@pytest.mark.django_db
+def test_shard_post_images(post_with_published_location):
+    post = post_with_published_location
+    legacy = "posts_images/legacy.jpg"
+    default_storage.save(legacy, make_image())
+    variant = default_storage.save(
+        f"variants/{legacy}/card.jpg", make_image((640, 320))
+    )
+    Post.objects.filter(pk=post.pk).update(image=legacy, image_meta={
+        "source": legacy, "width": 2000, "height": 1000,
+        "variants": {"card": {
+            "width": 640, "height": 320, "files": {"jpeg": variant}
+        }},
+    })
+    call_command("shard_post_images")
+    post.refresh_from_db()
+    assert post.image.name != legacy
+    assert Post.image.field.storage.is_hashed(post.image.name), (
+        "Убедитесь, что команда `shard_post_images` переносит файлы в"
+        " раскладку по хэшу."
+    )
+    assert not default_storage.exists(legacy)
+    assert post.image_meta["source"] == post.image.name
+    new_variant = post.image_meta["variants"]["card"]["files"]["jpeg"]
+    assert new_variant == f"variants/{post.image.name}/card.jpg"
+    assert default_storage.exists(new_variant)
+    assert not default_storage.exists(variant)
+
+
+@pytest.mark.django_db
+def test_collect_orphaned_media(post_with_published_location):
+    post = post_with_published_location
+    orphan = default_storage.save("posts_images/00/11/orphan.jpg", make_image())
+    orphan_variant = default_storage.save(
+        "variants/posts_images/00/11/orphan.jpg/card.jpg", make_image()
+    )
+    fresh = default_storage.save("posts_images/fresh.jpg", make_image())
+    kept_variant = default_storage.save(
+        f"variants/{post.image.name}/card.jpg", make_image()
+    )
+    old = time.time() - 3600 * 24
+    for name in (orphan, orphan_variant, post.image.name, kept_variant):
+        os.utime(default_storage.path(name), (old, old))
+
+    out = StringIO()
+    call_command("collect_orphaned_media", dry_run=True, stdout=out)
+    assert "файлов: 2" in out.getvalue(), (
+        "Убедитесь, что `collect_orphaned_media --dry-run` сообщает о"
+        " неиспользуемых файлах."
+    )
+    assert default_storage.exists(orphan)
+
+    call_command("collect_orphaned_media", pause=0, stdout=StringIO())
+    assert not default_storage.exists(orphan), (
+        "Убедитесь, что неиспользуемые изображения удаляются."
+    )
+    assert not default_storage.exists(orphan_variant)
+    assert not os.path.exists(default_storage.path("posts_images/00"))
+    assert default_storage.exists(fresh), (
+        "Убедитесь, что только что загруженные файлы не удаляются."
+    )
+    assert default_storage.exists(post.image.name)
+    assert default_storage.exists(kept_variant)
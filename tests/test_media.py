@@ -0,0 +1,91 @@
+import http.client
+import socketserver
+import threading
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.servers.basehttp import get_internal_wsgi_application
+
+from core.servers import SendfileWSGIServer
+
+DATA = bytes(range(256)) * 64
+
+
+@pytest.fixture
+def media_file():
+    return default_storage.save("files/data.bin", ContentFile(DATA))
+
+
+def test_full_and_conditional(client, media_file):
+    url = f"/media/{media_file}"
+    response = client.get(url)
+    assert response.status_code == 200
+    assert b"".join(response.streaming_content) == DATA
+    assert response["Content-Length"] == str(len(DATA))
+    assert response["Accept-Ranges"] == "bytes"
+    assert client.get(
+        url, HTTP_IF_NONE_MATCH=response["ETag"]
+    ).status_code == 304, (
+        "Убедитесь, что при совпадении ETag медиафайл не отдаётся заново."
+    )
+    assert client.get(
+        url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+    ).status_code == 304
+    assert client.get("/media/../manage.py").status_code == 404
+    assert client.get("/media/files/").status_code == 404
+
+
+def test_ranges(client, media_file):
+    url = f"/media/{media_file}"
+    response = client.get(url, HTTP_RANGE="bytes=10-19")
+    assert response.status_code == 206, (
+        "Убедитесь, что медиафайлы поддерживают запросы диапазонов."
+    )
+    assert b"".join(response.streaming_content) == DATA[10:20]
+    assert response["Content-Range"] == f"bytes 10-19/{len(DATA)}"
+
+    response = client.get(url, HTTP_RANGE="bytes=-5")
+    assert b"".join(response.streaming_content) == DATA[-5:]
+    response = client.get(url, HTTP_RANGE=f"bytes={len(DATA)}-")
+    assert response.status_code == 416
+    response = client.get(
+        url, HTTP_RANGE="bytes=0-1", HTTP_IF_RANGE='"stale"'
+    )
+    assert response.status_code == 200
+
+
+def test_offload_and_immutable(settings, client, media_file):
+    settings.MEDIA_OFFLOAD = "x-accel-redirect"
+    response = client.get(f"/media/{media_file}")
+    assert response["X-Accel-Redirect"] == f"/protected-media/{media_file}"
+    assert not response.content
+    assert "immutable" not in response["Cache-Control"]
+
+    digest = "ab" * 32
+    name = default_storage.save(
+        f"posts_images/ab/ab/{digest}.jpg", ContentFile(b"x")
+    )
+    assert "immutable" in client.get(f"/media/{name}")["Cache-Control"], (
+        "Убедитесь, что файлы с именем по хэшу кэшируются навсегда."
+    )
+
+
+def test_sendfile_server(media_file):
+    server = type(
+        "Server", (socketserver.ThreadingMixIn, SendfileWSGIServer), {}
+    )(("127.0.0.1", 0), None)
+    server.daemon_threads = True
+    server.set_app(get_internal_wsgi_application())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        for headers, expected in (
+            ({}, DATA), ({"Range": "bytes=100-4195"}, DATA[100:4196])
+        ):
+            connection = http.client.HTTPConnection(*server.server_address)
+            connection.request("GET", f"/media/{media_file}", headers=headers)
+            assert connection.getresponse().read() == expected
+            connection.close()
+    finally:
+        server.shutdown()
+        server.server_close()
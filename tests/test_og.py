@@ -0,0 +1,46 @@
+import pytest
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from blog.og import og_image_name
+
+
+def og_image_url(content):
+    marker = '<meta property="og:image" content="'
+    if marker not in content:
+        return None
+    return content.split(marker, 1)[1].split('"', 1)[0]
+
+
+@pytest.mark.django_db
+def test_og_image_generated_off_request(
+    client, django_capture_on_commit_callbacks, post_with_published_location
+):
+    post = post_with_published_location
+    url = f"/posts/{post.pk}/"
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        content = client.get(url).content.decode("utf-8")
+    assert og_image_url(content) is None and callbacks, (
+        "Убедитесь, что превью для соцсетей создаётся в фоне, а не во"
+        " время запроса."
+    )
+    name = og_image_name(post)
+    with default_storage.open(name) as file:
+        assert Image.open(file).size == (1200, 630)
+
+    content = client.get(url).content.decode("utf-8")
+    assert og_image_url(content).endswith(default_storage.url(name)), (
+        "Убедитесь, что страница поста содержит метатег og:image с"
+        " превью."
+    )
+    assert f'<meta property="og:title" content="{post.title}">' in content
+
+    with django_capture_on_commit_callbacks(execute=True):
+        post.title = "Новый заголовок"
+        post.save()
+    new_name = og_image_name(post)
+    assert new_name != name, (
+        "Убедитесь, что превью пересоздаётся при изменении заголовка."
+    )
+    assert default_storage.exists(new_name)
+    assert not default_storage.exists(name)
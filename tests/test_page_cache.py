@@ -0,0 +1,203 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+
+INVALIDATE_IN_OTHER_PROCESS = """
+import sys
+
+import django
+from django.conf import settings
+
+django.setup()
+settings.CACHES["default"]["LOCATION"] = sys.argv[1]
+from blog.page_cache import SCOPE_INDEX, invalidate
+
+invalidate(SCOPE_INDEX)
+"""
+
+
+def invalidate_in_other_process():
+    """Сбрасывает ленту из отдельного процесса, как cron или другой воркер."""
+    subprocess.run(
+        [
+            sys.executable, "-c", INVALIDATE_IN_OTHER_PROCESS,
+            str(settings.CACHES["default"]["LOCATION"]),
+        ],
+        cwd=Path(__file__).resolve().parent.parent / "blogicum",
+        env={"DJANGO_SETTINGS_MODULE": "blogicum.settings"},
+        check=True,
+    )
+
+
+@pytest.mark.django_db
+def test_anonymous_pages_are_cached(
+    client, django_assert_num_queries, post_with_published_location
+):
+    post = post_with_published_location
+    urls = (
+        "/",
+        f"/category/{post.category.slug}/",
+        f"/posts/{post.id}/",
+    )
+    for url in urls:
+        first = client.get(url)
+        with django_assert_num_queries(0):
+            second = client.get(url)
+        assert second.content == first.content, (
+            f"Убедитесь, что страница `{url}` для анонимного читателя"
+            " отдаётся из кэша."
+        )
+
+
+@pytest.mark.django_db
+def test_page_cache_invalidation(client, mixer, post_with_published_location):
+    post = post_with_published_location
+    feeds = ("/", f"/category/{post.category.slug}/")
+    detail = f"/posts/{post.id}/"
+    for url in (*feeds, detail):
+        client.get(url)
+
+    comment = mixer.blend("blog.Comment", post=post, text="Новый комментарий")
+    for url in feeds:
+        assert "Комментарии (1)" in client.get(url).content.decode("utf-8"), (
+            f"Убедитесь, что кэш страницы `{url}` сбрасывается после"
+            " добавления комментария."
+        )
+    assert comment.text in client.get(detail).content.decode("utf-8"), (
+        "Убедитесь, что кэш страницы поста сбрасывается после добавления"
+        " комментария."
+    )
+
+    post.title = "Изменённый заголовок"
+    post.save()
+    for url in (*feeds, detail):
+        assert post.title in client.get(url).content.decode("utf-8"), (
+            f"Убедитесь, что кэш страницы `{url}` сбрасывается после"
+            " изменения поста."
+        )
+
+
+@pytest.mark.django_db
+def test_logged_in_users_bypass_page_cache(
+    client, user_client, post_with_published_location
+):
+    post = post_with_published_location
+    client.get("/")
+    type(post).objects.filter(pk=post.pk).update(
+        title="Без сигналов", version=F("version") + 1
+    )
+    assert "Без сигналов" not in client.get("/").content.decode("utf-8")
+    assert "Без сигналов" in user_client.get("/").content.decode("utf-8"), (
+        "Убедитесь, что авторизованные пользователи не получают страницы"
+        " из общего кэша."
+    )
+
+
+@pytest.mark.django_db
+def test_conditional_get(
+    user_client, django_assert_max_num_queries, mixer,
+    post_with_published_location
+):
+    post = post_with_published_location
+    urls = (
+        "/",
+        f"/category/{post.category.slug}/",
+        f"/posts/{post.id}/",
+        f"/profile/{post.author.username}/",
+    )
+    etags = {}
+    for url in urls:
+        response = user_client.get(url)
+        assert response.has_header("ETag") and response.has_header(
+            "Last-Modified"
+        ), f"Убедитесь, что страница `{url}` отдаёт ETag и Last-Modified."
+        etags[url] = response["ETag"]
+        with django_assert_max_num_queries(3):
+            not_modified = user_client.get(
+                url, HTTP_IF_NONE_MATCH=etags[url]
+            )
+        assert not_modified.status_code == 304, (
+            f"Убедитесь, что неизменившаяся страница `{url}` отдаёт 304."
+        )
+
+    mixer.blend("blog.Comment", post=post)
+    for url in urls:
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+        assert response.status_code == 200, (
+            f"Убедитесь, что после нового комментария страница `{url}`"
+            " отдаётся заново."
+        )
+
+
+@pytest.mark.django_db
+def test_invalidation_reaches_other_processes(
+    client, post_with_published_location
+):
+    client.get("/")
+    invalidate_in_other_process()
+    with CaptureQueriesContext(connection) as captured:
+        client.get("/")
+    assert captured.captured_queries, (
+        "Убедитесь, что сброс кэша страниц в одном процессе веб-сервера"
+        " виден остальным процессам."
+    )
+
+
+@pytest.mark.django_db
+def test_etag_changes_after_invalidation_in_other_process(
+    user_client, post_with_published_location
+):
+    etag = user_client.get("/")["ETag"]
+    assert user_client.get("/", HTTP_IF_NONE_MATCH=etag).status_code == 304
+    invalidate_in_other_process()
+    assert user_client.get("/", HTTP_IF_NONE_MATCH=etag).status_code == 200, (
+        "Убедитесь, что ETag страницы меняется после изменения данных"
+        " в другом процессе веб-сервера."
+    )
+
+
+@pytest.mark.django_db
+def test_category_change_keeps_unrelated_pages(
+    client, django_assert_num_queries, mixer, post_with_published_location
+):
+    post = post_with_published_location
+    other = mixer.blend("blog.Category", is_published=True)
+    mixer.blend(
+        "blog.Post", category=other, author=post.author, is_published=True,
+        location=None
+    )
+    other_url = f"/category/{other.slug}/"
+    client.get(other_url)
+    client.get(f"/posts/{post.id}/")
+
+    post.category.title = "Новое название"
+    post.category.save()
+    with django_assert_num_queries(0):
+        client.get(other_url)
+    assert "Новое название" in client.get(f"/posts/{post.id}/").content.decode(
+        "utf-8"
+    ), "Убедитесь, что изменение категории сбрасывает страницы её постов."
+
+
+@pytest.mark.django_db
+def test_post_deletion_skips_per_comment_updates(
+    mixer, post_with_published_location
+):
+    post = post_with_published_location
+    mixer.cycle(3).blend("blog.Comment", post=post)
+    with CaptureQueriesContext(connection) as captured:
+        post.delete()
+    updates = [
+        query["sql"] for query in captured.captured_queries
+        if query["sql"].startswith('UPDATE "blog_post"')
+    ]
+    assert not updates, (
+        "Убедитесь, что при удалении поста счётчик комментариев не"
+        " пересчитывается для каждого удаляемого комментария."
+    )
@@ -0,0 +1,108 @@
+import re
+from http import HTTPStatus
+
+import pytest
+
+from conftest import N_PER_PAGE
+
+NEXT_LINK = r'href="\?cursor=([\w-]+)">\s*>>'
+PREVIOUS_LINK = r'href="\?cursor=([\w-]+)">\s*<<'
+
+
+def _walk_cursor_pages(client, url="/"):
+    pages = []
+    while url:
+        response = client.get(url)
+        assert response.status_code == HTTPStatus.OK, (
+            f"Убедитесь, что страница ленты `{url}` открывается без ошибок."
+        )
+        pages.append((response, list(response.context["page_obj"])))
+        match = re.search(NEXT_LINK, response.content.decode("utf-8"))
+        url = f"/?cursor={match.group(1)}" if match else None
+    return pages
+
+
+@pytest.mark.django_db
+def test_keyset_pagination(client, many_posts_with_published_locations):
+    posts = many_posts_with_published_locations
+    pages = _walk_cursor_pages(client)
+    walked = [post for _, page in pages for post in page]
+    assert len(pages) == -(-len(posts) // N_PER_PAGE), (
+        "Убедитесь, что ссылки «>>» с курсором проходят ленту постранично."
+    )
+    assert len({post.id for post in walked}) == len(posts), (
+        "Убедитесь, что при листании ленты по курсору посты не повторяются"
+        " и не пропускаются."
+    )
+    keys = [(post.pub_date, post.id) for post in walked]
+    assert keys == sorted(keys, reverse=True), (
+        "Убедитесь, что лента по курсору отсортирована по дате публикации"
+        " и id, «от новых к старым»."
+    )
+
+    last_response, _ = pages[-1]
+    previous_cursor = re.search(
+        PREVIOUS_LINK, last_response.content.decode("utf-8")
+    ).group(1)
+    back = client.get(f"/?cursor={previous_cursor}")
+    assert list(back.context["page_obj"]) == pages[-2][1], (
+        "Убедитесь, что ссылка «<<» с курсором возвращает на предыдущую"
+        " страницу ленты."
+    )
+
+
+@pytest.mark.django_db
+def test_page_number_fallback(client, many_posts_with_published_locations):
+    posts = many_posts_with_published_locations
+    first = list(client.get("/").context["page_obj"])
+    second = client.get("/?page=2")
+    assert second.status_code == HTTPStatus.OK
+    assert len(second.context["page_obj"]) == len(posts) - N_PER_PAGE, (
+        "Убедитесь, что старые ссылки вида `?page=N` продолжают работать."
+    )
+    assert not set(first) & set(second.context["page_obj"])
+    broken = client.get("/?cursor=not-a-cursor")
+    assert list(broken.context["page_obj"]) == first, (
+        "Убедитесь, что повреждённый курсор открывает первую страницу ленты."
+    )
+
+
+@pytest.mark.django_db
+def test_page_number_window(
+    client, django_assert_num_queries, many_posts_with_published_locations
+):
+    client.get("/?page=1")
+    with django_assert_num_queries(1):
+        response = client.get("/?page=1&fresh")
+    assert response.context["page_obj"].has_next(), (
+        "Убедитесь, что страница по номеру определяет наличие следующей"
+        " страницы без повторного подсчёта записей."
+    )
+    assert "?page=2" in response.content.decode("utf-8")
+
+
+@pytest.mark.django_db
+def test_comments_load_in_pages(
+    client, mixer, settings, post_with_published_location
+):
+    per_page = settings.COMMENTS_PER_PAGE
+    post = post_with_published_location
+    comments = mixer.cycle(per_page + 5).blend(
+        "blog.Comment", post=post, text=mixer.sequence("Комментарий_{0}_")
+    )
+    content = client.get(f"/posts/{post.id}/").content.decode("utf-8")
+    inline = [c for c in comments if f"{c.text}\n" in content]
+    assert len(inline) == per_page, (
+        "Убедитесь, что на странице поста сразу выводится только первая"
+        " страница комментариев."
+    )
+    more = re.search(r'href="(/posts/\d+/comments/\?cursor=[\w-]+)"', content)
+    assert more, (
+        "Убедитесь, что под комментариями есть ссылка на следующую страницу."
+    )
+    rest = client.get(more.group(1)).content.decode("utf-8")
+    assert [c for c in comments if f"{c.text}\n" in rest] == comments[
+        per_page:
+    ], "Убедитесь, что следующая страница содержит оставшиеся комментарии."
+    assert "/comments/?cursor=" not in rest
+    assert "<form" not in rest
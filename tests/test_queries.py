@@ -0,0 +1,41 @@
+from collections import Counter
+from http import HTTPStatus
+
+import pytest
+
+
+@pytest.fixture
+def own_comment(mixer, user, post_with_published_location):
+    return mixer.blend(
+        "blog.Comment", post=post_with_published_location, author=user
+    )
+
+
+@pytest.mark.django_db
+def test_each_row_fetched_once(
+    user_client, django_assert_num_queries, settings, own_comment
+):
+    settings.REGISTRY_CHECK_INTERVAL = 60
+    post = own_comment.post
+    # Сессия и пользователь, затем сами объекты страницы; категории
+    # и места после первой страницы берутся из реестров.
+    pages = (
+        (f"/posts/{post.id}/edit/", 5),
+        (f"/posts/{post.id}/delete/", 3),
+        (f"/posts/{post.id}/edit_comment/{own_comment.id}/", 3),
+        (f"/posts/{post.id}/delete_comment/{own_comment.id}/", 3),
+        (f"/category/{post.category.slug}/", 3),
+    )
+    for url, num_queries in pages:
+        with django_assert_num_queries(num_queries) as captured:
+            assert user_client.get(url).status_code == HTTPStatus.OK
+        repeated = [
+            sql for sql, count in Counter(
+                query["sql"] for query in captured.captured_queries
+            ).items()
+            if count > 1
+        ]
+        assert not repeated, (
+            f"Убедитесь, что страница `{url}` загружает каждую запись"
+            " из базы данных не больше одного раза."
+        )
@@ -0,0 +1,55 @@
+import pytest
+from django.utils import timezone
+
+from blog.registry import categories
+
+
+@pytest.mark.django_db
+def test_registry_sees_changes_from_other_workers(
+    settings, django_assert_num_queries, published_category
+):
+    settings.REGISTRY_CHECK_INTERVAL = 60
+    assert categories.get(published_category.pk).title == (
+        published_category.title
+    )
+    # Изменение в другом процессе: без сигналов этого процесса.
+    type(published_category).objects.filter(pk=published_category.pk).update(
+        title="Переименованная категория", updated_at=timezone.now()
+    )
+    with django_assert_num_queries(0):
+        categories.get(published_category.pk)
+
+    settings.REGISTRY_CHECK_INTERVAL = 0
+    assert categories.get(published_category.pk).title == (
+        "Переименованная категория"
+    ), (
+        "Убедитесь, что реестр категорий перечитывается после изменения"
+        " таблицы в другом процессе."
+    )
+
+
+@pytest.mark.django_db
+def test_cards_do_not_keep_stale_category(
+    settings, user_client, post_with_published_location
+):
+    post = post_with_published_location
+    category = post.category
+    settings.REGISTRY_CHECK_INTERVAL = 60
+    user_client.get("/")
+    # Другой процесс переименовал категорию и сменил версии её постов,
+    # а реестр этого процесса ещё не сверялся с базой.
+    type(category).objects.filter(pk=category.pk).update(
+        title="Новое название", updated_at=timezone.now()
+    )
+    type(post).objects.filter(pk=post.pk).update(version=post.version + 1)
+    assert "Новое название" not in user_client.get("/").content.decode(
+        "utf-8"
+    )
+
+    settings.REGISTRY_CHECK_INTERVAL = 0
+    assert "Новое название" in user_client.get("/").content.decode(
+        "utf-8"
+    ), (
+        "Убедитесь, что карточка, отрисованная по устаревшему реестру,"
+        " не остаётся в кэше после обновления реестра."
+    )
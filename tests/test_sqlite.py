@@ -0,0 +1,25 @@
+import pytest
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+
+
+@pytest.mark.django_db
+def test_pragmas_applied_to_new_connections(tmp_path):
+    database = DatabaseWrapper({
+        **connection.settings_dict, "NAME": str(tmp_path / "db.sqlite3")
+    })
+    try:
+        with database.cursor() as cursor:
+            pragmas = {
+                name: cursor.execute(f"PRAGMA {name}").fetchone()[0]
+                for name in ("journal_mode", "busy_timeout", "synchronous")
+            }
+    finally:
+        database.close()
+    assert pragmas == {
+        "journal_mode": "wal", "busy_timeout": 5000, "synchronous": 1
+    }, (
+        "Убедитесь, что каждое новое соединение SQLite настраивается "
+        "по SQLITE_PRAGMAS: журнал WAL, ожидание блокировки и "
+        "synchronous=NORMAL."
+    )
@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from blog.scheduler import bucketed_now, publish_due_posts
+
+
+@pytest.mark.django_db
+def test_scheduled_post_becomes_visible(client, future_posts):
+    post = future_posts[0]
+    assert not post.is_visible
+    type(post).objects.filter(pk=post.pk).update(
+        pub_date=timezone.now() - timedelta(minutes=1)
+    )
+    assert client.get(f"/posts/{post.id}/").status_code == 404
+
+    assert publish_due_posts() == 1, (
+        "Убедитесь, что планировщик открывает отложенные посты, время"
+        " публикации которых наступило."
+    )
+    assert client.get(f"/posts/{post.id}/").status_code == 200
+    assert post.title in client.get("/").content.decode("utf-8")
+    assert publish_due_posts() == 0
+
+
+@pytest.mark.django_db
+def test_category_publication_updates_visibility(
+    client, post_with_published_location
+):
+    post = post_with_published_location
+    category = post.category
+    assert post.is_visible
+
+    category.is_published = False
+    category.save()
+    post.refresh_from_db()
+    assert not post.is_visible, (
+        "Убедитесь, что снятие категории с публикации скрывает её посты."
+    )
+    assert client.get(f"/posts/{post.id}/").status_code == 404
+
+    category.is_published = True
+    category.save()
+    post.refresh_from_db()
+    assert post.is_visible, (
+        "Убедитесь, что повторная публикация категории возвращает её посты."
+    )
+
+
+@pytest.mark.django_db
+def test_category_edit_keeps_visibility(post_with_published_location):
+    post = post_with_published_location
+    type(post).objects.filter(pk=post.pk).update(is_visible=False)
+    category = type(post.category).objects.get(pk=post.category_id)
+    category.title = "Новый заголовок"
+    category.save()
+    post.refresh_from_db()
+    assert not post.is_visible, (
+        "Убедитесь, что видимость постов пересчитывается, только когда"
+        " меняется флаг публикации категории."
+    )
+
+
+@pytest.mark.django_db
+def test_category_deletion_hides_posts(client, post_with_published_location):
+    post = post_with_published_location
+    post.category.delete()
+    post.refresh_from_db()
+    assert post.category is None
+    assert not post.is_visible, (
+        "Убедитесь, что удаление категории скрывает её посты."
+    )
+    response = client.get("/")
+    assert response.status_code == 200, (
+        "Убедитесь, что после удаления категории главная страница открывается."
+    )
+    assert post.title not in response.content.decode("utf-8")
+
+
+@pytest.mark.django_db
+def test_scheduler_uses_time_bucket(future_posts, settings):
+    settings.FEED_TIME_BUCKET = 30
+    now = timezone.now()
+    post = future_posts[0]
+    bucket_start = bucketed_now(now)
+    assert bucket_start <= now < bucket_start + timedelta(seconds=30)
+    assert bucketed_now(bucket_start + timedelta(seconds=29)) == bucket_start
+    type(post).objects.filter(pk=post.pk).update(
+        pub_date=bucket_start + timedelta(seconds=1)
+    )
+    assert publish_due_posts(now=bucket_start) == 0, (
+        "Убедитесь, что отложенный пост не открывается раньше начала"
+        " интервала, в который попадает время его публикации."
+    )
+    assert publish_due_posts(
+        now=bucketed_now(bucket_start + timedelta(seconds=30))
+    ) == 1